@@ -0,0 +1,140 @@
+"""
+Import-time benchmark for our entry points.
+
+Each target is imported in a fresh interpreter with `python -X importtime`, so
+the numbers are true cold starts. Targets: the CLI (../main.py), the web
+backend (../web/backend/main.py) and every graph in langgraph.json.
+
+Usage (from deep-research-mini/):
+    python bench_importtime.py [--top 15] [--build] [--runs 3] [target ...]
+
+--build also calls each langgraph.json graph factory and reports its build time.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+repo_root = os.path.dirname(current_dir)
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Loads a file as a module without running its `if __name__ == "__main__"` block
+LOAD_FILE = (
+    "import importlib.util, sys, time\n"
+    "sys.path.insert(0, {project!r})\n"
+    "spec = importlib.util.spec_from_file_location('bench_target', {path!r})\n"
+    "module = importlib.util.module_from_spec(spec)\n"
+    "spec.loader.exec_module(module)\n"
+)
+BUILD_ATTR = (
+    "sys.stderr.write('BUILD_START\\n')\n"
+    "started = time.perf_counter()\n"
+    "getattr(module, {attr!r})()\n"
+    "print('BUILD_MS', (time.perf_counter() - started) * 1000)\n"
+)
+
+
+def discover_targets() -> dict:
+    targets = {
+        "cli": (os.path.join(repo_root, "main.py"), None),
+        "backend": (os.path.join(repo_root, "web", "backend", "main.py"), None),
+    }
+    with open(os.path.join(current_dir, "langgraph.json"), "r", encoding="utf-8") as f:
+        graphs = json.load(f).get("graphs", {})
+    for name, spec in graphs.items():
+        path, attr = spec.rsplit(":", 1)
+        targets[f"graph:{name}"] = (os.path.normpath(os.path.join(current_dir, path)), attr)
+    return targets
+
+
+def measure(path: str, attr: str, build: bool) -> dict:
+    code = LOAD_FILE.format(project=current_dir, path=path)
+    if build and attr:
+        code += BUILD_ATTR.format(attr=attr)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=current_dir, capture_output=True, text=True,
+    )
+
+    modules = []  # (module, self_us, cumulative_us, depth)
+    build_imports_us = 0
+    in_build = False
+    for line in proc.stderr.splitlines():
+        if line == "BUILD_START":
+            in_build = True
+            continue
+        m = IMPORT_LINE.match(line)
+        if m and in_build:
+            # Deferred imports paid on first use, not at import time
+            if len(m.group(3)) == 1:
+                build_imports_us += int(m.group(2))
+            continue
+        if m:
+            self_us, cumulative_us, indent, module = m.groups()
+            # importtime indents nested imports by two spaces per level
+            modules.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+
+    build_ms = None
+    for line in proc.stdout.splitlines():
+        if line.startswith("BUILD_MS"):
+            build_ms = float(line.split()[1])
+
+    return {
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+        "failed_in_build": in_build,
+        "total_ms": sum(cum for _, _, cum, depth in modules if depth == 0) / 1000,
+        "modules": modules,
+        "build_ms": build_ms,
+        "build_imports_ms": build_imports_us / 1000,
+    }
+
+
+def report(name: str, runs: list, top: int) -> None:
+    totals = [r["total_ms"] for r in runs]
+    last = runs[-1]
+    print(f"\n=== {name} ===")
+    if not last["ok"]:
+        phase = "Graph build" if last["failed_in_build"] else "Import"
+        print(f"❌ {phase} failed: {last['error']}")
+    print(f"import time: median {statistics.median(totals):.1f} ms "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}, {len(runs)} run(s))")
+    builds = [r["build_ms"] for r in runs if r["build_ms"] is not None]
+    if builds:
+        print(f"graph build:  median {statistics.median(builds):.1f} ms "
+              f"(of which deferred imports {last['build_imports_ms']:.1f} ms)")
+
+    # Top-level packages by cumulative time: what the entry point actually pulls in
+    packages = {}
+    for module, _, cumulative_us, _ in last["modules"]:
+        root = module.split(".")[0]
+        packages[root] = max(packages.get(root, 0), cumulative_us)
+    print(f"{'cumulative ms':>14}  package")
+    for root, cumulative_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{cumulative_us / 1000:>14.1f}  {root}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import-time report for the CLI, backend and graphs.")
+    parser.add_argument("targets", nargs="*", help="Subset of targets (cli, backend, graph:<name>); default all")
+    parser.add_argument("--top", type=int, default=15, help="Number of packages to list per target")
+    parser.add_argument("--runs", type=int, default=1, help="Fresh interpreters per target")
+    parser.add_argument("--build", action="store_true", help="Also call each graph factory")
+    args = parser.parse_args()
+
+    targets = discover_targets()
+    for name in args.targets or targets:
+        if name not in targets:
+            parser.error(f"Unknown target {name!r}; choose from {', '.join(targets)}")
+        path, attr = targets[name]
+        runs = [measure(path, attr, args.build) for _ in range(args.runs)]
+        report(name, runs, args.top)
+
+
+if __name__ == "__main__":
+    main()
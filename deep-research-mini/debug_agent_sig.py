@@ -5,13 +5,13 @@ sys.path.append(os.getcwd())
 
 try:
     from langgraph.prebuilt import create_react_agent
-    from src.models import chat_model
-    from src.tools import web_search
+    from src.models import get_chat_model
+    from src.tools import get_web_search
     
     print("Attempting to create planner agent with 'name' parameter...")
     planner = create_react_agent(
-        chat_model,
-        tools=[web_search],
+        get_chat_model(),
+        tools=[get_web_search()],
         name="planner"
     )
     print("✅ Successfully created planner with name")
@@ -10,7 +10,8 @@ print("--- Testing Imports ---")
 
 print("\n1. Importing researcher...")
 try:
-    from src.agents.research import researcher
+    from src.agents.research import make_researcher
+    researcher = make_researcher()
     print("✅ researcher imported successfully")
 except Exception:
     print("❌ Failed to import researcher")
@@ -18,7 +19,8 @@ except Exception:
 
 print("\n2. Importing planner...")
 try:
-    from src.agents.planner import planner
+    from src.agents.planner import make_planner
+    planner = make_planner()
     print("✅ planner imported successfully")
 except Exception:
     print("❌ Failed to import planner")
@@ -26,7 +28,8 @@ except Exception:
 
 print("\n3. Importing supervisor...")
 try:
-    from src.agents.supervisor import supervisor
+    from src.agents.supervisor import make_supervisor
+    supervisor = make_supervisor()
     print("✅ supervisor imported successfully")
 except Exception:
     print("❌ Failed to import supervisor")
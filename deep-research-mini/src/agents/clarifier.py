@@ -6,7 +6,7 @@ import os
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.join(current_dir, "deep-research-mini"))
 
-from src.models import chat_model
+from src.models import get_chat_model
 from src.utils import apply_prompt_template
 from langchain_core.messages import HumanMessage
 
@@ -26,7 +26,7 @@ from langchain_core.messages import HumanMessage
 #     print("--- PROMPT CONTENT END ---\n")
     
 #     print("--- 2. Invoking Model ---")
-#     response = await chat_model.ainvoke([HumanMessage(content=prompt_content)])
+#     response = await get_chat_model().ainvoke([HumanMessage(content=prompt_content)])
     
 #     print("\n--- MODEL RESPONSE ---")
 #     print(response.content)
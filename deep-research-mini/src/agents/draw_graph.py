@@ -5,11 +5,11 @@ from langchain_core.runnables.graph import MermaidDrawMethod
 # Add the project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-from src.agents.research import researcher
+from src.agents.research import make_researcher
 
 def draw_graph():
     print("Generating Mermaid flowchart...")
-    graph = researcher.get_graph()
+    graph = make_researcher().get_graph()
     
     # Generate Mermaid code
     mermaid_code = graph.draw_mermaid()
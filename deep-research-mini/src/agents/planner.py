@@ -1,12 +1,15 @@
-from langgraph.prebuilt import create_react_agent
-
-from src.models import chat_model
+from src.models import get_chat_model
 from src.utils import apply_prompt_template
-from src.tools import web_search
+from src.tools import get_web_search
+
+
+def make_planner():
+    """Graph factory for the standalone planner agent (see langgraph.json)."""
+    from langgraph.prebuilt import create_react_agent
 
-planner = create_react_agent(
-    chat_model,
-    tools=[web_search],
-    prompt=apply_prompt_template("planner"),
-    name="planner",
-)
+    return create_react_agent(
+        get_chat_model(),
+        tools=[get_web_search()],
+        prompt=apply_prompt_template("planner"),
+        name="planner",
+    )
@@ -5,7 +5,7 @@ import os
 # Add the project root to sys.path to ensure imports work correctly
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
-from src.agents.research import researcher
+from src.agents.research import make_researcher
 
 def run_agent(agent, message: str):
     print(f"Starting research on: {message}")
@@ -42,4 +42,4 @@ if __name__ == "__main__":
         # Default test query
         query = "如何宠溺小白脸？"
     
-    run_agent(researcher, query)
+    run_agent(make_researcher(), query)
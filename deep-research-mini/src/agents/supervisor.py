@@ -1,12 +1,15 @@
-from langgraph_supervisor import create_supervisor
-
-from src.agents.planner import planner
-from src.agents.research import researcher
-from src.models import chat_model
+from src.agents.planner import make_planner
+from src.agents.research import make_researcher
+from src.models import get_chat_model
 from src.utils import apply_prompt_template
 
-supervisor = create_supervisor(
-    [planner, researcher],
-    model=chat_model,
-    prompt=apply_prompt_template("supervisor"),
-).compile()
+
+def make_supervisor():
+    """Graph factory for the langgraph-supervisor multi-agent graph (see langgraph.json)."""
+    from langgraph_supervisor import create_supervisor
+
+    return create_supervisor(
+        [make_planner(), make_researcher()],
+        model=get_chat_model(),
+        prompt=apply_prompt_template("supervisor"),
+    ).compile()
@@ -1,8 +1,10 @@
-from typing import Annotated, List, Literal
+from typing import Annotated, List, Literal, Optional
 import sys
 import os
 import operator
 import json
+import asyncio
+from functools import lru_cache
 
 # Add the project root to sys.path if running directly
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -12,12 +14,20 @@ if project_root not in sys.path:
     sys.path.append(os.path.join(project_root, "deep-research-mini"))
 
 from langgraph.graph import StateGraph, START, END, MessagesState
-from langchain_core.messages import HumanMessage, AIMessage
-from src.models import chat_model
-from src.utils import apply_prompt_template
-from src.tools import web_search
+from langgraph.types import Send
+from langgraph.config import get_stream_writer
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+from src.model_router import get_router
+from src.utils import apply_prompt_messages, parse_dimensions, select_findings
+from src.search import make_search_tool, parse_providers
+from src.state_store import get_blob_store, internal_message, trim_internal
 
-print("--- WORKFLOW.PY IMPORTED ---")
+def extend_or_reset(current: Optional[list], update: Optional[list]) -> list:
+    """Reducer for per-round fan-out results: branches append, `None` clears."""
+    if update is None:
+        return []
+    return (current or []) + update
 
 # Define State
 class ResearchState(MessagesState):
@@ -28,9 +38,45 @@ class ResearchState(MessagesState):
     current_plan: str
     supervisor_decision: str # "CONTINUE" or "TERMINATE"
     user_intervention: str
+    dimensions: List[dict] # Core dimensions parsed from the initial CoT
+    dimension_findings: Annotated[List[dict], extend_or_reset] # Fan-out results of the current round
+
+# State of one per-dimension planner -> researcher subgraph (fan-out mode)
+class DimensionState(MessagesState):
+    dimension: str
+    supervisor_cot: str
+    round_count: int
+    max_rounds: int
+    max_queries: int
+    gathered_info: Annotated[List[str], operator.add]
+    current_plan: str
+
+# Model & tool resolution
+# Replay sessions (src/replay.py) inject recorded stand-ins through the run config.
+# Defaults are built lazily on first use, so importing this module stays cheap.
+async def _ainvoke(config: RunnableConfig, task: str, messages: list, tags: Optional[List[str]] = None):
+    """
+    Call the model routed for `task` (src/model_router.py). configurable["model_routes"]
+    can override the task -> profile mapping for one session.
+    """
+    configurable = config.get("configurable", {})
+    kwargs = {"config": {"tags": tags}} if tags else {}
+    if configurable.get("chat_model"):
+        return await configurable["chat_model"].ainvoke(messages, **kwargs)
+    return await get_router().ainvoke(task, messages, profile=configurable.get("model_routes", {}).get(task), **kwargs)
+
+def _tool(name: str, config: RunnableConfig):
+    configurable = config.get("configurable", {})
+    # `web_search` fans out to the session's search providers (configurable["search_providers"])
+    default_tools = {"web_search": lambda: make_search_tool(parse_providers(configurable.get("search_providers")))}
+    return configurable.get("tools", {}).get(name) or default_tools[name]()
+
+def _thread_id(config: RunnableConfig) -> Optional[str]:
+    # In-memory blobs are scoped to the session's thread and released with it
+    return config.get("configurable", {}).get("thread_id")
 
 # Node 1: Check Clarity
-async def check_clarity(state: ResearchState):
+async def check_clarity(state: ResearchState, config: RunnableConfig):
     """
     Analyzes the user's latest message (and history) to decide if clarification is needed.
     """
@@ -56,14 +102,14 @@ async def check_clarity(state: ResearchState):
     conversation_history = "\n".join([f"{m.type}: {m.content}" for m in history_msgs]) if history_msgs else "None"
     
     # Render the prompt
-    prompt_content = apply_prompt_template(
+    prompt_messages = apply_prompt_messages(
         "clarifier", 
         conversation_history=conversation_history, 
         user_input=user_input
     )
     
     # Call the model
-    response = await chat_model.ainvoke([HumanMessage(content=prompt_content)])
+    response = await _ainvoke(config, "check_clarity", prompt_messages)
     content = response.content.strip()
     
     if not content:
@@ -75,8 +121,11 @@ async def check_clarity(state: ResearchState):
         return {"messages": []}
     elif "CHAT" in content.upper():
         # If it's just chat, generate a polite response
-        chat_prompt = f"User said: {user_input}\nContext: {conversation_history}\nReply naturally and helpfully as a friendly assistant. Keep it brief."
-        chat_response = await chat_model.ainvoke([HumanMessage(content=chat_prompt)])
+        chat_messages = [
+            SystemMessage(content="Reply naturally and helpfully as a friendly assistant. Keep it brief."),
+            HumanMessage(content=f"Context: {conversation_history}\nUser said: {user_input}"),
+        ]
+        chat_response = await _ainvoke(config, "clarify_chat", chat_messages)
         return {"messages": [chat_response]}
     else:
         # Return the clarification questions
@@ -94,7 +143,7 @@ def route_after_check(state: ResearchState):
     return "supervisor"
 
 # Node 2: Supervisor (CoT + Evaluator)
-async def supervisor(state: ResearchState):
+async def supervisor(state: ResearchState, config: RunnableConfig):
     messages = state["messages"]
     # === [新增逻辑] 优先检查用户干预 ===
     # 检查 State 中是否有用户插入的指令
@@ -112,7 +161,7 @@ async def supervisor(state: ResearchState):
         intervention_msg = AIMessage(content=f"User intervened: {user_intervention}. Re-planning...")
         
         return {
-            "messages": [intervention_msg],
+            "messages": trim_internal(messages) + [internal_message(intervention_msg, "supervisor")],
             "supervisor_cot": updated_cot,
             # 3. 关键：强制消费掉这个指令（置空），防止死循环
             "user_intervention": None, 
@@ -127,18 +176,19 @@ async def supervisor(state: ResearchState):
         conversation_history = "\n".join([f"{m.type}: {m.content}" for m in messages])
         last_user_input = messages[-1].content
         
-        prompt = apply_prompt_template(
+        prompt_messages = apply_prompt_messages(
             "supervisor",
             user_input=last_user_input,
             conversation_history=conversation_history,
             supervisor_cot=None
         )
         
-        response = await chat_model.ainvoke([HumanMessage(content=prompt)])
+        response = await _ainvoke(config, "supervisor", prompt_messages)
         
         return {
-            "messages": [response],
+            "messages": trim_internal(messages) + [internal_message(response, "supervisor")],
             "supervisor_cot": response.content,
+            "dimensions": parse_dimensions(response.content),
             "round_count": 0,
             "max_rounds": 3,
             "gathered_info": [],
@@ -149,17 +199,20 @@ async def supervisor(state: ResearchState):
     else:
         # Get the latest gathered info (from the most recent research round)
         all_gathered = state.get("gathered_info", [])
-        latest_info = all_gathered[-1] if all_gathered else "None"
+        latest_info = await get_blob_store().aget(all_gathered[-1], _thread_id(config)) if all_gathered else "None"
+        
+        user_input = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
         
-        prompt = apply_prompt_template(
+        prompt_messages = apply_prompt_messages(
             "supervisor",
+            user_input=user_input,
             supervisor_cot=state.get("supervisor_cot", ""),
             gathered_info=latest_info,
             round_count=state.get("round_count", 0),
             max_rounds=state.get("max_rounds", 3)
         )
         
-        response = await chat_model.ainvoke([HumanMessage(content=prompt)])
+        response = await _ainvoke(config, "supervisor_eval", prompt_messages)
         
         content = response.content
         decision = "CONTINUE"
@@ -173,12 +226,24 @@ async def supervisor(state: ResearchState):
             updated_cot = content.strip()
             
         return {
-            "messages": [response],
+            "messages": trim_internal(messages) + [internal_message(response, "supervisor")],
             "supervisor_cot": updated_cot,
             "supervisor_decision": decision
         }
 
-def route_supervisor(state: ResearchState):
+def _fanout_enabled(config: RunnableConfig) -> bool:
+    fanout = config.get("configurable", {}).get("fanout")
+    if fanout is None:
+        fanout = os.getenv("RESEARCH_FANOUT", "0") not in ("", "0", "false", "False")
+    return bool(fanout)
+
+def _dimension_max_queries(config: RunnableConfig) -> int:
+    return int(config.get("configurable", {}).get("dimension_max_queries") or os.getenv("DIMENSION_MAX_QUERIES", "3"))
+
+def _max_dimensions(config: RunnableConfig) -> int:
+    return int(config.get("configurable", {}).get("max_dimensions") or os.getenv("MAX_DIMENSIONS", "6"))
+
+def route_supervisor(state: ResearchState, config: RunnableConfig):
     decision = state.get("supervisor_decision", "CONTINUE")
     round_count = state.get("round_count", 0)
     max_rounds = state.get("max_rounds", 3)
@@ -186,35 +251,58 @@ def route_supervisor(state: ResearchState):
     if decision == "TERMINATE" or round_count >= max_rounds:
         return "reporter"
     
+    # Fan-out mode: one planner -> researcher subgraph per core dimension, run concurrently
+    dimensions = state.get("dimensions") or []
+    if _fanout_enabled(config) and len(dimensions) > 1:
+        max_queries = _dimension_max_queries(config)
+        return [
+            Send("dimension_research", {
+                "dimension": f"{d['title']}: {d['description']}" if d["description"] else d["title"],
+                "supervisor_cot": state.get("supervisor_cot", ""),
+                "gathered_info": state.get("gathered_info", []),
+                "round_count": round_count,
+                "max_rounds": max_rounds,
+                "max_queries": max_queries,
+            })
+            for d in dimensions[:_max_dimensions(config)]
+        ]
+    
     return "planner"
 
 # Node 3: Planner
-async def planner(state: ResearchState):
+async def planner(state: ResearchState, config: RunnableConfig):
     current_round = state.get("round_count", 0) + 1
+    gathered_info = await get_blob_store().aget_all(state.get("gathered_info", []), _thread_id(config))
     
-    prompt = apply_prompt_template(
+    prompt_messages = apply_prompt_messages(
         "planner_loop",
         round_count=current_round,
         max_rounds=state.get("max_rounds", 3),
         supervisor_cot=state.get("supervisor_cot", ""),
-        gathered_info="\n\n".join(state.get("gathered_info", [])) if state.get("gathered_info") else "None"
+        gathered_info="\n\n".join(gathered_info) if gathered_info else "None",
+        dimension=state.get("dimension")
     )
     
-    response = await chat_model.ainvoke([HumanMessage(content=prompt)])
+    response = await _ainvoke(config, "planner", prompt_messages)
     
     return {
-        "messages": [response],
+        "messages": trim_internal(state["messages"]) + [internal_message(response, "planner")],
         "current_plan": response.content,
         "round_count": current_round
     }
 
 # Node 4: Researcher
-async def researcher(state: ResearchState):
+EXTRACTION_INSTRUCTIONS = "You are a helper. Extract the search queries from the plan as a JSON list of strings. Return ONLY the JSON list (e.g. [\"query1\", \"query2\"])."
+
+async def researcher(state: ResearchState, config: RunnableConfig):
     plan = state.get("current_plan", "")
     
     # Extract queries
-    extraction_prompt = f"You are a helper. Extract the search queries from this plan as a JSON list of strings. Return ONLY the JSON list (e.g. [\"query1\", \"query2\"]).\nPlan:\n{plan}"
-    extraction = await chat_model.ainvoke([HumanMessage(content=extraction_prompt)])
+    extraction_messages = [
+        SystemMessage(content=EXTRACTION_INSTRUCTIONS),
+        HumanMessage(content=f"Plan:\n{plan}"),
+    ]
+    extraction = await _ainvoke(config, "query_extraction", extraction_messages)
     
     queries = []
     try:
@@ -232,11 +320,13 @@ async def researcher(state: ResearchState):
         queries = [plan[:200]] # Fallback
         
     findings = []
+    # Per-run search budget (dimension subgraphs get a smaller one)
+    max_queries = state.get("max_queries") or 5
     
-    # Execute searches (limit 5)
-    for q in queries[:5]:
+    # Execute searches
+    for q in queries[:max_queries]:
         try:
-            res = await web_search.ainvoke(q)
+            res = await _tool("web_search", config).ainvoke(q)
             findings.append(f"Query: {q}\nResult: {res}")
         except Exception as e:
             findings.append(f"Query: {q}\nError: {e}")
@@ -245,16 +335,69 @@ async def researcher(state: ResearchState):
     
     # Display message
     display_msg = f"**Researching websites...**\nExecuted {len(queries)} searches:\n"
-    for q in queries[:5]:
+    for q in queries[:max_queries]:
         display_msg += f"- {q}\n"
     
+    # Raw search results are the largest state values: keep only a reference in the checkpoint
+    findings_ref = await get_blob_store().aput(combined_findings, _thread_id(config))
+    
     return {
-        "messages": [AIMessage(content=display_msg)],
-        "gathered_info": [combined_findings]
+        "messages": trim_internal(state["messages"]) + [internal_message(AIMessage(content=display_msg), "researcher")],
+        "gathered_info": [findings_ref]
     }
 
 # Node 5: Reporter
-async def reporter(state: ResearchState):
+def _report_mode(config: RunnableConfig) -> str:
+    return config.get("configurable", {}).get("report_mode") or os.getenv("REPORT_MODE", "sectioned")
+
+def _section_findings_chars(config: RunnableConfig) -> int:
+    return int(config.get("configurable", {}).get("section_findings_chars") or os.getenv("SECTION_FINDINGS_CHARS", "12000"))
+
+def run_settings(config: RunnableConfig) -> dict:
+    """
+    Effective values of the settings that change the graph's control flow. Entry points
+    pin them into configurable, so the session log records them and replay restores them.
+    """
+    return {
+        "fanout": _fanout_enabled(config),
+        "report_mode": _report_mode(config),
+        "dimension_max_queries": _dimension_max_queries(config),
+        "max_dimensions": _max_dimensions(config),
+        "section_findings_chars": _section_findings_chars(config),
+    }
+
+async def _sectioned_report(user_query: str, dimensions: List[dict], gathered_info: List[str], config: RunnableConfig) -> str:
+    """
+    One concurrent LLM call per core dimension, each given only the findings relevant
+    to it, then a short call for the executive summary. Finished sections go to the
+    "custom" stream as {"section", "title", "content"} (section 0 is the summary).
+    """
+    write = get_stream_writer()
+    outline = [d["title"] for d in dimensions]
+    budget = _section_findings_chars(config)
+
+    async def write_section(index: int, dimension: dict) -> str:
+        prompt_messages = apply_prompt_messages(
+            "reporter_section",
+            user_query=user_query,
+            outline=outline,
+            dimension=dimension,
+            findings=select_findings(gathered_info, dimension, budget) or "None",
+        )
+        # The tag lets stream consumers tell the concurrent section streams apart
+        response = await _ainvoke(config, "reporter_section", prompt_messages, tags=[f"section:{index}"])
+        write({"section": index, "title": dimension["title"], "content": response.content})
+        return response.content
+
+    sections = await asyncio.gather(*(write_section(i, d) for i, d in enumerate(dimensions, start=1)))
+
+    prompt_messages = apply_prompt_messages("reporter_summary", user_query=user_query, sections="\n\n".join(sections))
+    summary = await _ainvoke(config, "reporter_summary", prompt_messages, tags=["section:0"])
+    write({"section": 0, "title": "summary", "content": summary.content})
+
+    return "\n\n".join([summary.content, *sections])
+
+async def reporter(state: ResearchState, config: RunnableConfig):
     # Find the last user message (effective query)
     messages = state["messages"]
     user_query = "Unknown Query"
@@ -263,15 +406,71 @@ async def reporter(state: ResearchState):
             user_query = m.content
             break
 
-    prompt = apply_prompt_template(
-        "reporter",
-        user_query=user_query,
-        supervisor_cot=state.get("supervisor_cot", ""),
-        gathered_info="\n\n".join(state.get("gathered_info", []))
+    gathered_info = await get_blob_store().aget_all(state.get("gathered_info", []), _thread_id(config))
+    dimensions = state.get("dimensions") or []
+
+    if _report_mode(config) == "sectioned" and len(dimensions) > 1:
+        response = AIMessage(content=await _sectioned_report(user_query, dimensions, gathered_info, config))
+    else:
+        prompt_messages = apply_prompt_messages(
+            "reporter",
+            user_query=user_query,
+            supervisor_cot=state.get("supervisor_cot", ""),
+            gathered_info="\n\n".join(gathered_info)
+        )
+        response = await _ainvoke(config, "reporter", prompt_messages)
+    # The report is the only research message the conversation keeps
+    return {"messages": trim_internal(messages) + [response]}
+
+# Fan-out: per-dimension subgraph, reusing the planner and researcher nodes
+dimension_builder = StateGraph(DimensionState)
+dimension_builder.add_node("planner", planner)
+dimension_builder.add_node("researcher", researcher)
+dimension_builder.add_edge(START, "planner")
+dimension_builder.add_edge("planner", "researcher")
+dimension_builder.add_edge("researcher", END)
+
+@lru_cache(maxsize=None)
+def get_dimension_graph():
+    """Compiled on first fan-out, so importing this module does not pay for it."""
+    # checkpointer=False: branch state is transient, only its findings reach the parent checkpoint
+    return dimension_builder.compile(checkpointer=False)
+
+async def dimension_research(task: dict, config: RunnableConfig):
+    """Map step: research one core dimension (receives the Send payload as its state)."""
+    result = await get_dimension_graph().ainvoke({"messages": [], **task}, config)
+    new_findings = result.get("gathered_info", [])[len(task["gathered_info"]):]
+    return {
+        "dimension_findings": [{
+            "dimension": task["dimension"],
+            "plan": result.get("current_plan", ""),
+            "findings": new_findings,
+        }]
+    }
+
+async def merge_findings(state: ResearchState, config: RunnableConfig):
+    """Reduce step: fold this round's per-dimension findings into one gathered_info entry."""
+    store = get_blob_store()
+    thread_id = _thread_id(config)
+    results = state.get("dimension_findings", [])
+    sections = []
+    plans = []
+    for result in results:
+        findings = await store.aget_all(result["findings"], thread_id)
+        sections.append(f"## Dimension: {result['dimension']}\n\n" + "\n\n".join(findings))
+        plans.append(f"[{result['dimension']}]\n{result['plan']}")
+    
+    display_msg = f"**Researched {len(results)} dimensions in parallel.**\n" + "".join(
+        f"- {result['dimension']}\n" for result in results
     )
     
-    response = await chat_model.ainvoke([HumanMessage(content=prompt)])
-    return {"messages": [response]}
+    return {
+        "messages": trim_internal(state["messages"]) + [internal_message(AIMessage(content=display_msg), "researcher")],
+        "gathered_info": [await store.aput("\n\n".join(sections), thread_id)],
+        "current_plan": "\n\n".join(plans),
+        "round_count": state.get("round_count", 0) + 1,
+        "dimension_findings": None,
+    }
 
 # Build Graph
 builder = StateGraph(ResearchState)
@@ -281,6 +480,8 @@ builder.add_node("supervisor", supervisor)
 builder.add_node("planner", planner)
 builder.add_node("researcher", researcher)
 builder.add_node("reporter", reporter)
+builder.add_node("dimension_research", dimension_research)
+builder.add_node("merge_findings", merge_findings)
 
 builder.add_edge(START, "check_clarity")
 builder.add_conditional_edges(
@@ -292,15 +493,21 @@ builder.add_conditional_edges(
 builder.add_conditional_edges(
     "supervisor",
     route_supervisor,
-    {"planner": "planner", "reporter": "reporter"}
+    {"planner": "planner", "reporter": "reporter", "dimension_research": "dimension_research"}
 )
 
 builder.add_edge("planner", "researcher")
 builder.add_edge("researcher", "supervisor")
+builder.add_edge("dimension_research", "merge_findings")
+builder.add_edge("merge_findings", "supervisor")
 builder.add_edge("reporter", END)
 
-# Compile
-graph = builder.compile()
+# Graph factory for `langgraph dev` (see langgraph.json).
+# Compiling is deferred so importing `builder` does not pay for it.
+# Nothing releases blob-store threads here, so findings stay inline in the checkpoints
+# unless BLOB_STORE_DIR puts them on disk (see src/state_store.py).
+def make_graph():
+    return builder.compile()
 
 # Export builder for testing
-__all__ = ["graph", "builder", "ResearchState"]
+__all__ = ["make_graph", "builder", "ResearchState", "run_settings"]
@@ -0,0 +1,279 @@
+import atexit
+import hashlib
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Iterator, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, message_to_dict
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, JSONL is the default format
+    msgpack = None
+
+# Default location for per-session logs: deep-research-mini/logs/sessions
+DEFAULT_LOG_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "sessions"
+)
+
+
+
+def prompt_key(messages: list) -> str:
+    """Stable hash of a chat prompt, used to match recorded LLM outputs on replay."""
+    payload = json.dumps([[m.type, m.content] for m in messages], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def to_jsonable(obj: Any) -> Any:
+    """Convert graph inputs/outputs (messages, nested dicts) into plain JSON-able data."""
+    if isinstance(obj, BaseMessage):
+        return message_to_dict(obj)
+    if isinstance(obj, dict):
+        return {str(key): to_jsonable(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_jsonable(item) for item in obj]
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    return str(obj)
+
+
+class _SharedWriter:
+    """
+    One background thread that encodes and writes the records of every open
+    EventLog, so a worker serving hundreds of sessions still runs a single
+    writer thread. File handles are only touched from this thread.
+    """
+
+    def __init__(self, flush_interval: float = 0.5):
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()  # (log, record) | (log, threading.Event) to close it
+        self._files = {}  # log -> open file
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def put(self, log: "EventLog", item) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((log, item))
+
+    def _run(self) -> None:
+        while True:
+            try:
+                log, item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                for f in self._files.values():
+                    f.flush()
+                continue
+            if isinstance(item, threading.Event):
+                f = self._files.pop(log, None)
+                if f is not None:
+                    f.close()
+                item.set()
+                continue
+            try:
+                f = self._files.get(log)
+                if f is None:
+                    f = self._files[log] = open(log.path, "ab", buffering=64 * 1024)
+                f.write(log._encode(item))
+            except Exception as e:
+                # Never let a bad record kill the writer thread
+                print(f"[EventLog] Failed to write {item.get('event')} record to {log.path}: {e}")
+
+
+_writer = _SharedWriter()
+_open_logs = set()
+
+
+@atexit.register
+def _close_all() -> None:
+    # Flush whatever is still buffered if the process exits without closing its logs
+    for log in list(_open_logs):
+        log.close()
+
+
+class EventLog:
+    """
+    Append-only, per-session event log.
+
+    `append` only enqueues the record; encoding and file writes happen on a
+    shared background thread so the event loop never blocks on disk I/O.
+    """
+
+    def __init__(self, path: str, fmt: str = "jsonl"):
+        if fmt == "msgpack" and msgpack is None:
+            raise RuntimeError("EVENT_LOG_FORMAT=msgpack requires the `msgpack` package.")
+        self.path = path
+        self.fmt = fmt
+        self._seq = itertools.count()
+        self._closed = False
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        _open_logs.add(self)
+
+    @classmethod
+    def for_session(cls, session_id: str, log_dir: Optional[str] = None, fmt: Optional[str] = None) -> "EventLog":
+        log_dir = log_dir or os.getenv("EVENT_LOG_DIR") or DEFAULT_LOG_DIR
+        fmt = fmt or os.getenv("EVENT_LOG_FORMAT", "jsonl")
+        return cls(os.path.join(log_dir, f"{session_id}.{fmt}"), fmt=fmt)
+
+    def append(self, event: str, **fields) -> None:
+        if self._closed:
+            return
+        record = {"seq": next(self._seq), "ts": time.time(), "event": event, **fields}
+        _writer.put(self, record)
+
+    def close(self) -> None:
+        """Write out everything appended so far and close the file (idempotent, blocking)."""
+        if self._closed:
+            return
+        self._closed = True
+        _open_logs.discard(self)
+        done = threading.Event()
+        _writer.put(self, done)
+        done.wait()
+
+    def _encode(self, record: dict) -> bytes:
+        record = to_jsonable(record)
+        if self.fmt == "msgpack":
+            return msgpack.packb(record, use_bin_type=True)
+        return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def read_events(path: str) -> Iterator[dict]:
+    """Yield the records of a JSONL or msgpack event log in order."""
+    if path.endswith(".msgpack"):
+        if msgpack is None:
+            raise RuntimeError("Reading a msgpack event log requires the `msgpack` package.")
+        with open(path, "rb") as f:
+            yield from msgpack.Unpacker(f, raw=False)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class EventRecorder(BaseCallbackHandler):
+    """
+    LangChain callback handler that mirrors graph activity into an EventLog:
+    node start/end (with the node's state update as the diff), LLM calls with
+    token usage, and tool inputs/outputs.
+
+    Pass the run config to also record its plain configurable settings (fanout,
+    report_mode, ...) with every run_start; the dict is read at each run, so later
+    changes to it are picked up.
+    """
+
+    # Handlers only enqueue records, so run them inline instead of in a thread pool
+    run_inline = True
+
+    def __init__(self, log: EventLog, config: Optional[dict] = None):
+        self.log = log
+        self.config = config
+        self._root_run: Optional[UUID] = None
+        self._nodes: dict = {}  # run_id -> (node, started_at)
+        self._llm_calls: dict = {}  # run_id -> (node, prompt_key, started_at)
+        self._tool_calls: dict = {}  # run_id -> (tool, input, started_at)
+        self._nested_tools: set = set()  # tool runs inside a recorded tool (not logged)
+
+    # --- Graph runs & nodes ---
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get("name")
+        if parent_run_id is None:
+            self._root_run = run_id
+            self.log.append("run_start", run_id=str(run_id), input=inputs, settings=self._settings())
+        elif metadata and name and metadata.get("langgraph_node") == name:
+            self._nodes[run_id] = (name, time.perf_counter())
+            self.log.append("node_start", node=name, run_id=str(run_id), step=metadata.get("langgraph_step"))
+
+    def _settings(self) -> dict:
+        configurable = (self.config or {}).get("configurable", {})
+        # Only plain values: model/tool stand-ins and the thread id are not settings
+        return {
+            k: v for k, v in configurable.items()
+            if k != "thread_id" and isinstance(v, (str, int, float, bool))
+        }
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        if run_id in self._nodes:
+            node, started = self._nodes.pop(run_id)
+            self.log.append(
+                "node_end", node=node, run_id=str(run_id),
+                duration_ms=(time.perf_counter() - started) * 1000, diff=outputs,
+            )
+        elif run_id == self._root_run:
+            self.log.append("run_end", run_id=str(run_id))
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        if run_id in self._nodes:
+            node, started = self._nodes.pop(run_id)
+            self.log.append(
+                "node_error", node=node, run_id=str(run_id),
+                duration_ms=(time.perf_counter() - started) * 1000, error=repr(error),
+            )
+        elif run_id == self._root_run:
+            self.log.append("run_error", run_id=str(run_id), error=repr(error))
+
+    # --- LLM calls ---
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        key = prompt_key(messages[0])
+        self._llm_calls[run_id] = (node, key, time.perf_counter())
+        self.log.append("llm_start", node=node, run_id=str(run_id), key=key, prompt=messages[0])
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        node, key, started = self._llm_calls.pop(run_id, (None, None, time.perf_counter()))
+        message = getattr(response.generations[0][0], "message", None) if response.generations else None
+        self.log.append(
+            "llm_end", node=node, run_id=str(run_id), key=key,
+            duration_ms=(time.perf_counter() - started) * 1000,
+            output=message,
+            usage=getattr(message, "usage_metadata", None),
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        node, key, started = self._llm_calls.pop(run_id, (None, None, time.perf_counter()))
+        self.log.append(
+            "llm_error", node=node, run_id=str(run_id), key=key,
+            duration_ms=(time.perf_counter() - started) * 1000, error=repr(error),
+        )
+
+    # --- Tool calls ---
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        if parent_run_id in self._tool_calls or parent_run_id in self._nested_tools:
+            # A tool called from inside a recorded tool: replay answers the outer call as a whole
+            self._nested_tools.add(run_id)
+            return
+        tool = (serialized or {}).get("name") or kwargs.get("name")
+        self._tool_calls[run_id] = (tool, input_str, time.perf_counter())
+        self.log.append(
+            "tool_start", tool=tool, node=(metadata or {}).get("langgraph_node"),
+            run_id=str(run_id), input=input_str,
+        )
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        if run_id not in self._tool_calls:
+            self._nested_tools.discard(run_id)
+            return
+        tool, input_str, started = self._tool_calls.pop(run_id)
+        self.log.append(
+            "tool_end", tool=tool, run_id=str(run_id), input=input_str,
+            duration_ms=(time.perf_counter() - started) * 1000, output=output,
+        )
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        if run_id not in self._tool_calls:
+            self._nested_tools.discard(run_id)
+            return
+        tool, input_str, started = self._tool_calls.pop(run_id)
+        self.log.append(
+            "tool_error", tool=tool, run_id=str(run_id), input=input_str,
+            duration_ms=(time.perf_counter() - started) * 1000, error=repr(error), message=str(error),
+        )
@@ -0,0 +1,151 @@
+"""
+Per-node model routing with latency SLOs.
+
+Every LLM call in the workflow names its task ("planner", "query_extraction",
+...). The task maps to a model profile (src/models.py: fast / balanced /
+quality, configurable through MODEL_CONFIG and MODEL_ROUTES), so small jobs
+never wait on the large model.
+
+Each attempt is bounded by the profile's `timeout`. If the call is still
+running after the profile's `slo`, or fails, the `fallback` profile is started
+as well and the first successful answer wins (the other call is cancelled).
+
+Latency is recorded per route (task, profile): call counts, timeouts, errors,
+fallbacks and p50/p95 over a rolling window, plus prompt tokens and how many
+of them the provider served from its prefix cache.
+"""
+import asyncio
+import time
+from collections import defaultdict, deque
+from functools import lru_cache
+from typing import Optional
+
+from src.models import get_chat_model, load_model_config
+
+WINDOW = 500  # latencies kept per route for percentiles
+
+
+def percentile(values: list, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class RouteStats:
+    def __init__(self):
+        self.calls = 0
+        self.ok = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cancelled = 0  # lost the race against a fallback
+        self.fallbacks = 0  # times this route had to start its fallback
+        self.latencies = deque(maxlen=WINDOW)
+        self.input_tokens = 0
+        self.cached_tokens = 0
+
+    def record_usage(self, usage: Optional[dict]) -> None:
+        if not usage:
+            return
+        self.input_tokens += usage.get("input_tokens", 0)
+        # OpenAI-compatible APIs (Ark included) report prompt_tokens_details.cached_tokens
+        self.cached_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0)
+
+    def as_dict(self) -> dict:
+        values = list(self.latencies)
+        return {
+            "calls": self.calls, "ok": self.ok, "errors": self.errors, "timeouts": self.timeouts,
+            "cancelled": self.cancelled, "fallbacks": self.fallbacks,
+            "p50_ms": percentile(values, 0.5), "p95_ms": percentile(values, 0.95),
+            "max_ms": max(values) if values else None,
+            "input_tokens": self.input_tokens, "cached_tokens": self.cached_tokens,
+            "cache_hit_rate": self.cached_tokens / self.input_tokens if self.input_tokens else None,
+        }
+
+
+class ModelRouter:
+    def __init__(self, profiles: dict, routes: dict):
+        self.profiles = profiles
+        self.routes = routes
+        self.stats = defaultdict(RouteStats)  # (task, profile) -> RouteStats
+
+    def profile_for(self, task: str) -> str:
+        return self.routes.get(task, "balanced")
+
+    async def ainvoke(self, task: str, messages: list, profile: Optional[str] = None, **kwargs):
+        """Invoke the model routed for `task`, falling back when the profile's SLO is missed."""
+        profile = profile or self.profile_for(task)
+        spec = self.profiles[profile]
+        fallback = spec.get("fallback")
+        slo = spec.get("slo")
+
+        pending = {asyncio.ensure_future(self._attempt(task, profile, messages, **kwargs))}
+        fallback_started = False
+        error = None
+        try:
+            while pending:
+                can_fall_back = fallback and not fallback_started
+                done, pending = await asyncio.wait(
+                    pending, timeout=slo if can_fall_back else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                for attempt in done:
+                    if attempt.exception() is None:
+                        return attempt.result()
+                    error = attempt.exception()
+                # SLO missed (nothing done yet) or the call failed: bring in the faster profile
+                if can_fall_back:
+                    fallback_started = True
+                    self.stats[(task, profile)].fallbacks += 1
+                    print(f"[Router] {task}: {profile} {'failed' if done else f'exceeded {slo}s SLO'}, starting fallback '{fallback}'")
+                    pending.add(asyncio.ensure_future(self._attempt(task, fallback, messages, **kwargs)))
+            raise error
+        finally:
+            for attempt in pending:
+                attempt.cancel()
+
+    async def _attempt(self, task: str, profile: str, messages: list, **kwargs):
+        stats = self.stats[(task, profile)]
+        stats.calls += 1
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(
+                get_chat_model(profile).ainvoke(messages, **kwargs), self.profiles[profile].get("timeout")
+            )
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+        stats.ok += 1
+        stats.latencies.append((time.perf_counter() - started) * 1000)
+        stats.record_usage(getattr(response, "usage_metadata", None))
+        return response
+
+    def latency_stats(self) -> dict:
+        return {
+            f"{task}/{profile}": {"model": self.profiles[profile]["model"], **stats.as_dict()}
+            for (task, profile), stats in sorted(self.stats.items())
+        }
+
+    def format_stats(self) -> str:
+        def ms(value):
+            return "-" if value is None else f"{value:.0f}"
+
+        lines = [f"{'route':<34}{'model':<30}{'calls':>6}{'fail':>6}{'fb':>5}{'p50ms':>8}{'p95ms':>8}{'tok in':>9}{'cache':>7}"]
+        for route, s in self.latency_stats().items():
+            cache = "-" if s["cache_hit_rate"] is None else f"{s['cache_hit_rate']:.0%}"
+            lines.append(
+                f"{route:<34}{s['model']:<30}{s['calls']:>6}{s['errors'] + s['timeouts']:>6}{s['fallbacks']:>5}"
+                f"{ms(s['p50_ms']):>8}{ms(s['p95_ms']):>8}{s['input_tokens']:>9}{cache:>7}"
+            )
+        return "\n".join(lines)
+
+
+@lru_cache(maxsize=None)
+def get_router() -> ModelRouter:
+    """Process-wide router (and latency stats), built from the model config on first use."""
+    return ModelRouter(*load_model_config())
@@ -1,19 +1,128 @@
+import json
 import os
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+from functools import lru_cache
 
-load_dotenv()
-
-api_key = os.getenv("ARK_API_KEY")
 base_url = "https://ark.cn-beijing.volces.com/api/v3"
 
-if not api_key:
-    # Fallback or warning
-    print("Warning: ARK_API_KEY not found in environment variables.")
+DEFAULT_PROFILE = "balanced"
+
+# Named model profiles. `timeout` is the hard per-call limit (seconds); when a call is
+# still running after `slo` seconds the router also starts the `fallback` profile and
+# takes whichever answers first (see src/model_router.py).
+DEFAULT_PROFILES = {
+    "fast": {
+        "model": "doubao-seed-1-6-flash-250828",
+        "timeout": 30,
+        "slo": None,
+        "fallback": None,
+        # Short extraction/classification jobs don't need the reasoning pass
+        "extra_body": {"thinking": {"type": "disabled"}},
+    },
+    "balanced": {
+        "model": "doubao-seed-1-6-flash-250828",
+        "timeout": 120,
+        "slo": 60,
+        "fallback": "fast",
+    },
+    "quality": {
+        "model": "doubao-seed-1-6-250615",
+        "timeout": 300,
+        "slo": 150,
+        "fallback": "balanced",
+    },
+}
+
+# Node / task -> profile
+DEFAULT_ROUTES = {
+    "check_clarity": "fast",
+    "clarify_chat": "fast",
+    "query_extraction": "fast",
+    "supervisor": "balanced",
+    "supervisor_eval": "balanced",
+    "planner": "balanced",
+    "reporter": "quality",
+    "reporter_section": "quality",
+    "reporter_summary": "balanced",
+}
+
+
+def _load_env():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+@lru_cache(maxsize=None)
+def load_model_config() -> tuple:
+    """
+    (profiles, routes): the defaults above, overridden by the JSON file at MODEL_CONFIG
+        {"profiles": {"quality": {"model": "...", "slo": 90}}, "routes": {"planner": "fast"}}
+    and then by MODEL_ROUTES="planner=fast,reporter=balanced".
+    """
+    _load_env()
+    profiles = {name: dict(spec) for name, spec in DEFAULT_PROFILES.items()}
+    routes = dict(DEFAULT_ROUTES)
+
+    path = os.getenv("MODEL_CONFIG")
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+        for name, spec in overrides.get("profiles", {}).items():
+            profiles.setdefault(name, {"timeout": 120, "slo": None, "fallback": None}).update(spec)
+        routes.update(overrides.get("routes", {}))
+
+    for item in os.getenv("MODEL_ROUTES", "").split(","):
+        if "=" in item:
+            task, profile = item.split("=", 1)
+            routes[task.strip()] = profile.strip()
+
+    for task, profile in routes.items():
+        if profile not in profiles:
+            raise ValueError(f"Route {task!r} uses unknown model profile {profile!r}; available: {', '.join(profiles)}")
+    for name, spec in profiles.items():
+        if spec.get("fallback") and spec["fallback"] not in profiles:
+            raise ValueError(f"Model profile {name!r} falls back to unknown profile {spec['fallback']!r}")
+    return profiles, routes
+
+
+def get_chat_model(profile: str = DEFAULT_PROFILE):
+    """
+    Build the chat model for a profile on first use.
+    Importing this module stays cheap: langchain_openai and .env loading are deferred until here.
+    """
+    return _build_chat_model(profile)
+
+
+@lru_cache(maxsize=None)
+def _build_chat_model(profile: str):
+    spec = load_model_config()[0][profile]
+    if os.getenv("STUB_LLM") == "1":
+        # Local load tests: canned answers with simulated latency (see src/stubs.py)
+        from src.stubs import StubChatModel
+        return StubChatModel()
+
+    from langchain_openai import ChatOpenAI
+    api_key = os.getenv("ARK_API_KEY")
+
+    if not api_key:
+        # Fallback or warning
+        print("Warning: ARK_API_KEY not found in environment variables.")
+
+    return ChatOpenAI(
+        model=spec["model"],
+        base_url=spec.get("base_url", base_url),
+        api_key=api_key,
+        temperature=spec.get("temperature", 0),
+        timeout=spec.get("timeout"),
+        # The router handles slow calls itself; client-side retries would hide them
+        max_retries=spec.get("max_retries", 1),
+        extra_body=spec.get("extra_body"),
+        # Usage (incl. cached prompt tokens) on streamed calls too; the router reports cache hit rates
+        stream_usage=True,
+    )
+
 
-chat_model = ChatOpenAI(
-    model="doubao-seed-1-6-flash-250828",
-    base_url=base_url,
-    api_key=api_key,
-    temperature=0,
-)
+def __getattr__(name):
+    # Backwards compatibility: `from src.models import chat_model` still works, lazily
+    if name == "chat_model":
+        return get_chat_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
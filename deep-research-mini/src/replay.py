@@ -0,0 +1,199 @@
+"""
+Re-drive a recorded research session from its event log.
+
+Every LLM call and tool call is answered from the recorded outputs, so a
+production session can be profiled and debugged offline: no network, no API
+keys, no model latency.
+
+Usage (from deep-research-mini/):
+    python -m src.replay logs/sessions/<session_id>.jsonl [--record-dir DIR]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from typing import Any, Optional
+
+# Add the project root (deep-research-mini) to sys.path when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import StructuredTool
+from langgraph.checkpoint.memory import MemorySaver
+
+from src.agents.workflow import builder
+from src.event_log import EventLog, EventRecorder, prompt_key, read_events
+from src.state_store import get_blob_store
+
+
+class ReplayMismatch(Exception):
+    """Raised when the replayed session asks for a call that was never recorded."""
+
+
+class RecordedCalls:
+    """Recorded LLM and tool outputs, indexed for lookup during replay."""
+
+    def __init__(self, events: list):
+        self.llm = defaultdict(deque)  # prompt key -> recorded output messages
+        self.tools = defaultdict(deque)  # (tool, input) -> ("ok" | "error", payload)
+        self.inputs = []  # graph inputs, one per recorded run
+        self.settings = []  # configurable settings of each recorded run (fanout, report_mode, ...)
+        for ev in events:
+            kind = ev["event"]
+            if kind == "run_start":
+                self.inputs.append(ev["input"])
+                self.settings.append(ev.get("settings") or {})
+            elif kind == "llm_end" and ev.get("output"):
+                self.llm[ev["key"]].append(ev["output"])
+            elif kind == "tool_end":
+                self.tools[(ev["tool"], ev["input"])].append(("ok", ev["output"]))
+            elif kind == "tool_error":
+                self.tools[(ev["tool"], ev["input"])].append(("error", ev.get("message") or ev["error"]))
+
+    def tool_names(self) -> set:
+        return {tool for tool, _ in self.tools}
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that answers each prompt with the output recorded for it."""
+
+    recorded: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = prompt_key(messages)
+        outputs = self.recorded.llm.get(key)
+        if not outputs:
+            raise ReplayMismatch(f"No recorded LLM output for prompt {key[:12]} (the session diverged).")
+        message = messages_from_dict([outputs.popleft()])[0]
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def replay_tool(name: str, recorded: RecordedCalls) -> StructuredTool:
+    """Build a stand-in for tool `name` that returns its recorded outputs."""
+
+    async def _replay(query: str):
+        outputs = recorded.tools.get((name, query))
+        if not outputs:
+            raise ReplayMismatch(f"No recorded `{name}` output for input {query!r}.")
+        status, payload = outputs.popleft()
+        if status == "error":
+            raise Exception(payload)
+        return payload
+
+    return StructuredTool.from_function(
+        coroutine=_replay, name=name, description=f"Replays recorded `{name}` outputs."
+    )
+
+
+def restore_input(graph_input: dict) -> dict:
+    """Turn a logged graph input back into live objects (messages)."""
+    restored = dict(graph_input)
+    if "messages" in restored:
+        restored["messages"] = messages_from_dict(restored["messages"])
+    return restored
+
+
+def summarize(events: list) -> dict:
+    """Aggregate per-node wall time and per-node LLM token usage from an event log."""
+    summary = defaultdict(lambda: {"calls": 0, "node_ms": 0.0, "llm_calls": 0, "llm_ms": 0.0,
+                                   "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0})
+    for ev in events:
+        if ev["event"] == "node_end":
+            row = summary[ev["node"]]
+            row["calls"] += 1
+            row["node_ms"] += ev["duration_ms"]
+        elif ev["event"] == "llm_end":
+            row = summary[ev.get("node") or "?"]
+            row["llm_calls"] += 1
+            row["llm_ms"] += ev["duration_ms"]
+            usage = ev.get("usage") or {}
+            row["input_tokens"] += usage.get("input_tokens", 0)
+            # Prompt tokens served from the provider's prefix cache
+            row["cached_tokens"] += (usage.get("input_token_details") or {}).get("cache_read", 0)
+            row["output_tokens"] += usage.get("output_tokens", 0)
+    return dict(summary)
+
+
+def print_checkpoint_sizes(events: list) -> None:
+    sizes = [ev["bytes"] for ev in events if ev["event"] == "checkpoint"]
+    if sizes:
+        print(f"\nCheckpoint writes: {len(sizes)}, total {sum(sizes)} bytes, "
+              f"first {sizes[0]}, last {sizes[-1]}, max {max(sizes)} bytes/step")
+
+
+def print_summary(title: str, summary: dict) -> None:
+    print(f"\n{title}")
+    print(f"{'node':<16}{'calls':>6}{'node ms':>12}{'llm calls':>11}{'llm ms':>12}{'tok in':>9}{'cached':>9}{'tok out':>9}")
+    for node, row in sorted(summary.items(), key=lambda item: -item[1]["node_ms"]):
+        cache_rate = f"{row['cached_tokens'] / row['input_tokens']:.0%}" if row["input_tokens"] else "-"
+        print(f"{node:<16}{row['calls']:>6}{row['node_ms']:>12.1f}{row['llm_calls']:>11}"
+              f"{row['llm_ms']:>12.1f}{row['input_tokens']:>9}{cache_rate:>9}{row['output_tokens']:>9}")
+
+
+async def replay_session(path: str, record_dir: Optional[str] = None) -> list:
+    """
+    Re-run every recorded graph invocation of a session against recorded outputs.
+    Returns the final state values after each invocation.
+    """
+    events = list(read_events(path))
+    recorded = RecordedCalls(events)
+
+    graph = builder.compile(checkpointer=MemorySaver())
+    config = {
+        "configurable": {
+            "thread_id": f"replay-{os.path.basename(path)}",
+            "chat_model": ReplayChatModel(recorded=recorded),
+            "tools": {name: replay_tool(name, recorded) for name in recorded.tool_names()},
+        }
+    }
+
+    log = None
+    if record_dir:
+        session_id = os.path.splitext(os.path.basename(path))[0]
+        log = EventLog.for_session(f"{session_id}.replay", log_dir=record_dir)
+        config["callbacks"] = [EventRecorder(log, config)]
+
+    get_blob_store().claim(config["configurable"]["thread_id"])
+    results = []
+    try:
+        for graph_input, settings in zip(recorded.inputs, recorded.settings):
+            # Run with the recorded session's settings so the graph takes the same route
+            config["configurable"].update(settings)
+            results.append(await graph.ainvoke(restore_input(graph_input), config=config))
+    finally:
+        get_blob_store().release(config["configurable"]["thread_id"])
+        if log:
+            log.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded research session offline.")
+    parser.add_argument("log", help="Path to a session event log (.jsonl or .msgpack)")
+    parser.add_argument("--record-dir", help="Also write an event log of the replay into this directory")
+    args = parser.parse_args()
+
+    events = list(read_events(args.log))
+    print_summary("Recorded session", summarize(events))
+    print_checkpoint_sizes(events)
+
+    started = time.perf_counter()
+    results = asyncio.run(replay_session(args.log, record_dir=args.record_dir))
+    elapsed = time.perf_counter() - started
+
+    print(f"\n✅ Replayed {len(results)} graph run(s) in {elapsed * 1000:.1f} ms")
+    if results and results[-1].get("messages"):
+        print("\n--- Final message ---")
+        print(results[-1]["messages"][-1].content)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Search providers for the researcher.
+
+A provider is any object with a `name` and
+    async def search(self, query: str, max_results: int) -> list[dict]
+returning results shaped like {"title", "url", "content", "score", "provider"}.
+
+Providers are selected per session with `configurable["search_providers"]`
+(e.g. "local,tavily"), falling back to the SEARCH_PROVIDERS env var and then
+to "tavily". Results from several providers are merged with reciprocal rank fusion.
+"""
+import asyncio
+import os
+from functools import lru_cache
+from typing import Callable, Iterable, Union
+
+DEFAULT_PROVIDERS = "tavily"
+
+# name -> zero-argument factory; providers are built lazily and cached
+_factories: dict = {}
+
+
+def register_provider(name: str, factory: Callable[[], object]) -> None:
+    _factories[name] = factory
+    get_provider.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def get_provider(name: str):
+    if name not in _factories:
+        raise ValueError(f"Unknown search provider {name!r}; available: {', '.join(sorted(_factories))}")
+    return _factories[name]()
+
+
+def parse_providers(value: Union[str, Iterable[str], None]) -> tuple:
+    """Normalize "local, tavily" / ["local", "tavily"] / None into a tuple of provider names."""
+    if not value:
+        value = os.getenv("SEARCH_PROVIDERS", DEFAULT_PROVIDERS)
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(name.strip() for name in value if name.strip())
+
+
+def merge_results(result_lists: list, max_results: int, k: int = 60) -> list:
+    """Reciprocal rank fusion over several ranked result lists, de-duplicated by URL."""
+    fused = {}
+    for results in result_lists:
+        for rank, item in enumerate(results):
+            key = item.get("url") or item.get("content")
+            entry = fused.setdefault(key, {"item": item, "score": 0.0})
+            entry["score"] += 1.0 / (k + rank + 1)
+    ranked = sorted(fused.values(), key=lambda entry: -entry["score"])
+    return [entry["item"] for entry in ranked[:max_results]]
+
+
+async def search(query: str, providers: Iterable[str], max_results: int = 5) -> list:
+    """Query providers concurrently and merge their results. Fails only if every provider fails."""
+    providers = list(providers)
+    outcomes = await asyncio.gather(
+        *(get_provider(name).search(query, max_results) for name in providers),
+        return_exceptions=True,
+    )
+    result_lists = []
+    errors = []
+    for name, outcome in zip(providers, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"[Search] Provider '{name}' failed: {outcome}")
+            errors.append(outcome)
+        else:
+            result_lists.append(outcome)
+    if errors and not result_lists:
+        raise errors[0]
+    if len(result_lists) == 1:
+        return result_lists[0][:max_results]
+    return merge_results(result_lists, max_results)
+
+
+@lru_cache(maxsize=None)
+def make_search_tool(providers: tuple, max_results: int = 5):
+    """`web_search` tool backed by the given providers (cached per provider selection)."""
+    from langchain_core.tools import StructuredTool
+
+    async def _search(query: str):
+        return await search(query, providers, max_results)
+
+    return StructuredTool.from_function(
+        coroutine=_search,
+        name="web_search",
+        description=f"Search ({', '.join(providers)}). Input should be a search query string.",
+    )
+
+
+def _tavily():
+    from src.search.tavily import TavilyProvider
+    return TavilyProvider()
+
+
+def _local():
+    from src.search.local import LocalSearchProvider
+    return LocalSearchProvider()
+
+
+def _stub():
+    from src.stubs import StubSearchProvider
+    return StubSearchProvider()
+
+
+register_provider("tavily", _tavily)
+register_provider("local", _local)
+register_provider("stub", _stub)
@@ -0,0 +1,228 @@
+"""
+Local full-text search over a document corpus we ship ourselves.
+
+The index is a single SQLite file with an FTS5 table ranked by BM25. It is
+built incrementally (only new or modified files are re-indexed, deleted files
+are dropped) and opened with a large mmap_size so queries read pages straight
+from the OS page cache.
+
+CJK text has no spaces, so every CJK character is indexed as its own token and
+query words become phrase queries ("电池" -> "电 池"). That matches any
+substring without a language-specific segmenter.
+
+Usage (from deep-research-mini/):
+    python -m src.search.local build <corpus_dir> [--index PATH]
+    python -m src.search.local query "<text>" [--index PATH]
+"""
+import argparse
+import os
+import re
+import sqlite3
+import time
+from typing import Optional
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "local_index.sqlite"
+)
+URL_SCHEME = "local://"
+EXTENSIONS = (".md", ".markdown", ".txt")
+CHUNK_CHARS = 1200
+MMAP_BYTES = 256 * 1024 * 1024
+
+_CJK = re.compile(r"([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af])")
+_QUERY_TERMS = re.compile(r"\w+", re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_path ON chunks(path);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(title, body, tokenize='unicode61');
+"""
+
+
+def segment(text: str) -> str:
+    """Put spaces around CJK characters so FTS5 indexes each one as a token."""
+    return _CJK.sub(r" \1 ", text)
+
+
+def to_match_query(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 MATCH expression: quoted phrases joined with OR."""
+    phrases = []
+    for term in _QUERY_TERMS.findall(query):
+        tokens = segment(term).split()
+        if tokens:
+            phrases.append('"' + " ".join(tokens) + '"')
+    return " OR ".join(phrases) if phrases else None
+
+
+def split_chunks(text: str, size: int = CHUNK_CHARS) -> list:
+    """Group paragraphs into chunks of roughly `size` characters."""
+    chunks, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) > size:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def document_title(path: str, text: str) -> str:
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            return line.lstrip("#").strip()[:200]
+    return os.path.basename(path)
+
+
+class LocalIndex:
+    """SQLite FTS5 index of a document corpus."""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def build(self, corpus_dir: str) -> dict:
+        """Incrementally sync the index with `corpus_dir`. Returns counts of what changed."""
+        corpus_dir = os.path.abspath(corpus_dir)
+        indexed = {row[0]: (row[1], row[2]) for row in self.conn.execute("SELECT path, mtime, size FROM documents")}
+        seen = set()
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "chunks": 0}
+
+        with self.conn:
+            for root, _, files in os.walk(corpus_dir):
+                for filename in files:
+                    if not filename.lower().endswith(EXTENSIONS):
+                        continue
+                    full_path = os.path.join(root, filename)
+                    rel_path = os.path.relpath(full_path, corpus_dir).replace(os.sep, "/")
+                    seen.add(rel_path)
+                    st = os.stat(full_path)
+                    if indexed.get(rel_path) == (st.st_mtime, st.st_size):
+                        stats["unchanged"] += 1
+                        continue
+
+                    with open(full_path, "r", encoding="utf-8", errors="replace") as f:
+                        text = f.read()
+                    stats["updated" if rel_path in indexed else "added"] += 1
+                    self._delete(rel_path)
+                    title = document_title(rel_path, text)
+                    self.conn.execute(
+                        "INSERT INTO documents(path, mtime, size, title) VALUES (?, ?, ?, ?)",
+                        (rel_path, st.st_mtime, st.st_size, title),
+                    )
+                    for chunk in split_chunks(text):
+                        chunk_id = self.conn.execute(
+                            "INSERT INTO chunks(path, content) VALUES (?, ?)", (rel_path, chunk)
+                        ).lastrowid
+                        self.conn.execute(
+                            "INSERT INTO chunks_fts(rowid, title, body) VALUES (?, ?, ?)",
+                            (chunk_id, segment(title), segment(chunk)),
+                        )
+                        stats["chunks"] += 1
+
+            for rel_path in set(indexed) - seen:
+                self._delete(rel_path)
+                stats["removed"] += 1
+
+        self.conn.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('optimize')")
+        self.conn.commit()
+        return stats
+
+    def _delete(self, rel_path: str) -> None:
+        self.conn.execute(
+            "DELETE FROM chunks_fts WHERE rowid IN (SELECT id FROM chunks WHERE path = ?)", (rel_path,)
+        )
+        self.conn.execute("DELETE FROM chunks WHERE path = ?", (rel_path,))
+        self.conn.execute("DELETE FROM documents WHERE path = ?", (rel_path,))
+
+    def search(self, query: str, max_results: int = 5) -> list:
+        match = to_match_query(query)
+        if not match:
+            return []
+        rows = self.conn.execute(
+            """
+            SELECT c.path, d.title, c.content, bm25(chunks_fts, 2.0, 1.0) AS rank
+            FROM chunks_fts
+            JOIN chunks c ON c.id = chunks_fts.rowid
+            JOIN documents d ON d.path = c.path
+            WHERE chunks_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+            """,
+            (match, max_results),
+        ).fetchall()
+        return [
+            {"title": title, "url": URL_SCHEME + path, "content": content, "score": -rank, "provider": "local"}
+            for path, title, content, rank in rows
+        ]
+
+    def read(self, url: str) -> Optional[str]:
+        """Full text of an indexed document, addressed by its local:// URL."""
+        rel_path = url[len(URL_SCHEME):] if url.startswith(URL_SCHEME) else url
+        rows = self.conn.execute("SELECT content FROM chunks WHERE path = ? ORDER BY id", (rel_path,)).fetchall()
+        return "\n\n".join(row[0] for row in rows) if rows else None
+
+
+class LocalSearchProvider:
+    """Search provider over the LocalIndex at LOCAL_SEARCH_INDEX."""
+
+    name = "local"
+
+    def __init__(self, index_path: Optional[str] = None):
+        index_path = index_path or os.getenv("LOCAL_SEARCH_INDEX", DEFAULT_INDEX_PATH)
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(
+                f"Local search index not found at {index_path}. Build it with `python -m src.search.local build <corpus_dir>`."
+            )
+        self.index = LocalIndex(index_path)
+
+    async def search(self, query: str, max_results: int) -> list:
+        # Sub-millisecond against the mmap'd index, so it runs inline on the event loop
+        return self.index.search(query, max_results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the local search index.")
+    parser.add_argument("--index", default=os.getenv("LOCAL_SEARCH_INDEX", DEFAULT_INDEX_PATH), help="Index file path")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="Index (or incrementally re-index) a corpus directory")
+    build_cmd.add_argument("corpus_dir")
+    query_cmd = sub.add_parser("query", help="Run a query against the index")
+    query_cmd.add_argument("text")
+    query_cmd.add_argument("-n", type=int, default=5)
+    args = parser.parse_args()
+
+    index = LocalIndex(args.index)
+    if args.command == "build":
+        started = time.perf_counter()
+        stats = index.build(args.corpus_dir)
+        print(f"✅ Indexed {args.corpus_dir} -> {args.index} in {time.perf_counter() - started:.2f}s: {stats}")
+    else:
+        started = time.perf_counter()
+        results = index.search(args.text, args.n)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for item in results:
+            print(f"[{item['score']:.2f}] {item['title']} ({item['url']})\n    {item['content'][:160]!r}")
+        print(f"\n{len(results)} result(s) in {elapsed_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+from src.tools import get_web_search
+
+
+class TavilyProvider:
+    """Web search through the Tavily API (the original `web_search` tool)."""
+
+    name = "tavily"
+
+    async def search(self, query: str, max_results: int) -> list:
+        tool = get_web_search()
+        # Call the API wrapper rather than the tool: the tool is also named `web_search`, so invoking it
+        # would nest a second tool run inside the outer `web_search` and the event log would record both
+        response = await tool.api_wrapper.raw_results_async(
+            query=query,
+            max_results=max_results,
+            search_depth=tool.search_depth or "basic",
+            include_domains=tool.include_domains,
+            exclude_domains=tool.exclude_domains,
+            include_answer=tool.include_answer,
+            include_raw_content=tool.include_raw_content,
+            include_images=tool.include_images or False,
+            include_image_descriptions=tool.include_image_descriptions,
+            include_favicon=tool.include_favicon,
+            topic=tool.topic or "general",
+            time_range=tool.time_range,
+            country=tool.country,
+            auto_parameters=tool.auto_parameters,
+            start_date=None,
+            end_date=None,
+            include_usage=tool.include_usage,
+            exact_match=tool.exact_match,
+        )
+        results = response.get("results", []) if isinstance(response, dict) else []
+        return [
+            {
+                "title": item.get("title", ""),
+                "url": item.get("url", ""),
+                "content": item.get("content", ""),
+                "score": item.get("score"),
+                "provider": self.name,
+            }
+            for item in results[:max_results]
+        ]
@@ -0,0 +1,178 @@
+"""
+State hygiene for the research workflow.
+
+Keeps checkpoints small as rounds accumulate:
+- BlobStore: large values (raw search findings) live in a content-addressed
+  side store and the graph state only holds their `blob:sha256:<hex>` reference.
+  On disk (BLOB_STORE_DIR) blobs persist. In memory, values are only offloaded for
+  threads an owner has claim()ed and will release() when the session ends (the CLI,
+  the web backend, replay); any other thread, e.g. graphs served through
+  langgraph.json's make_graph(), keeps its values inline in the checkpoint.
+- Internal messages (supervisor CoT revisions, plans, researcher status) are only
+  needed for streaming; each node removes the previous ones when it writes a new one.
+- MeasuredMemorySaver: a MemorySaver that records how many bytes each checkpoint writes.
+"""
+import asyncio
+import hashlib
+import os
+from collections import defaultdict
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
+
+from langchain_core.messages import AIMessage, RemoveMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+BLOB_PREFIX = "blob:sha256:"
+
+# Nodes whose messages no later node reads (their content is also kept in dedicated state keys)
+INTERNAL_NODES = {"supervisor", "planner", "researcher"}
+
+
+class BlobStore:
+    """Content-addressed store for large state values, in memory or on disk."""
+
+    def __init__(self, directory: Optional[str] = None, min_size: int = 2048):
+        self.directory = directory
+        self.min_size = min_size
+        self._blobs: dict = {}  # claimed thread_id -> {digest: text}, in-memory mode only
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def put(self, text: str, thread_id: Optional[str] = None) -> str:
+        """
+        Store `text` and return its reference. Small values are returned inline, and so is
+        everything in memory for a thread nobody claimed (nothing would ever release it).
+        """
+        data = text.encode("utf-8")
+        if len(data) < self.min_size or (not self.directory and thread_id not in self._blobs):
+            return text
+        digest = hashlib.sha256(data).hexdigest()
+        if self.directory:
+            path = self._path(digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(data)
+        else:
+            self._blobs[thread_id][digest] = text
+        return BLOB_PREFIX + digest
+
+    def get(self, value: str, thread_id: Optional[str] = None) -> str:
+        """Resolve a reference back to its text; non-references are returned unchanged."""
+        if not isinstance(value, str) or not value.startswith(BLOB_PREFIX):
+            return value
+        digest = value[len(BLOB_PREFIX):]
+        if self.directory:
+            with open(self._path(digest), "r", encoding="utf-8") as f:
+                return f.read()
+        blobs = self._blobs.get(thread_id, {})
+        if digest not in blobs:
+            raise KeyError(
+                f"Blob {digest[:12]} not found for thread {thread_id!r}: in-memory blobs do not survive "
+                "a restart or release(); set BLOB_STORE_DIR when checkpoints outlive the process"
+            )
+        return blobs[digest]
+
+    def claim(self, thread_id: str) -> None:
+        """Offload this thread's large values to memory; the caller must release() it when the session ends."""
+        if not self.directory:
+            self._blobs.setdefault(thread_id, {})
+
+    def release(self, thread_id: str) -> None:
+        """Forget a thread's in-memory blobs (call when its session ends)."""
+        self._blobs.pop(thread_id, None)
+
+    # Disk-backed stores do file I/O, so keep it off the event loop
+    async def aput(self, text: str, thread_id: Optional[str] = None) -> str:
+        if self.directory:
+            return await asyncio.to_thread(self.put, text, thread_id)
+        return self.put(text, thread_id)
+
+    async def aget(self, value: str, thread_id: Optional[str] = None) -> str:
+        if self.directory:
+            return await asyncio.to_thread(self.get, value, thread_id)
+        return self.get(value, thread_id)
+
+    async def aget_all(self, values: Iterable[str], thread_id: Optional[str] = None) -> list:
+        values = list(values)
+        if self.directory:
+            return await asyncio.to_thread(lambda: [self.get(v, thread_id) for v in values])
+        return [self.get(v, thread_id) for v in values]
+
+
+@lru_cache(maxsize=None)
+def get_blob_store() -> BlobStore:
+    """
+    Shared store; set BLOB_STORE_DIR to keep blobs on disk instead of in process memory
+    (needed whenever checkpoints outlive the process or are shared between workers).
+    """
+    return BlobStore(
+        directory=os.getenv("BLOB_STORE_DIR") or None,
+        min_size=int(os.getenv("BLOB_MIN_BYTES", "2048")),
+    )
+
+
+def internal_message(message: AIMessage, node: str) -> AIMessage:
+    """Tag a message as internal to `node` so later steps can trim it."""
+    message.name = node
+    return message
+
+
+def trim_internal(messages: list) -> list:
+    """RemoveMessage updates for every internal message currently in state."""
+    return [
+        RemoveMessage(id=m.id)
+        for m in messages
+        if isinstance(m, AIMessage) and m.name in INTERNAL_NODES and m.id
+    ]
+
+
+class MeasuredMemorySaver(MemorySaver):
+    """
+    MemorySaver that records the bytes written by every checkpoint, per channel.
+    MemorySaver re-serializes each channel whose version changed, so this is the
+    real per-step write cost.
+    """
+
+    def __init__(self, *args, on_checkpoint: Optional[Callable[[str, dict], None]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_checkpoint = on_checkpoint
+        self.sizes = defaultdict(list)  # thread_id -> [{"step", "ns", "bytes", "channels"}]
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        result = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+
+        channels = {
+            k: len(self.blobs[(thread_id, checkpoint_ns, k, v)][1]) for k, v in new_versions.items()
+        }
+        saved, saved_metadata, _ = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+        record = {
+            "step": (metadata or {}).get("step"),
+            "ns": checkpoint_ns,
+            "bytes": sum(channels.values()) + len(saved[1]) + len(saved_metadata[1]),
+            "channels": channels,
+        }
+        self.sizes[thread_id].append(record)
+        if self.on_checkpoint:
+            self.on_checkpoint(thread_id, record)
+        return result
+
+    def stored_bytes(self, thread_id: str) -> int:
+        """Total bytes currently held for a thread (all checkpoints and channel blobs)."""
+        total = sum(len(blob[1]) for key, blob in self.blobs.items() if key[0] == thread_id)
+        for checkpoints in self.storage[thread_id].values():
+            total += sum(len(saved[1]) + len(meta[1]) for saved, meta, _ in checkpoints.values())
+        return total
+
+    def format_sizes(self, thread_id: str) -> str:
+        lines = [f"{'step':>5}{'bytes':>10}  largest channels"]
+        for record in self.sizes[thread_id]:
+            top = sorted(record["channels"].items(), key=lambda item: -item[1])[:3]
+            lines.append(f"{record['step']!s:>5}{record['bytes']:>10}  " + ", ".join(f"{k}={n}" for k, n in top))
+        lines.append(f"stored total: {self.stored_bytes(thread_id)} bytes")
+        return "\n".join(lines)
@@ -0,0 +1,157 @@
+"""
+Stub LLM and search backends with configurable latency, for local load tests.
+
+    STUB_LLM=1                 every model profile is served by StubChatModel
+    SEARCH_PROVIDERS=stub      web_search is served by StubSearchProvider
+
+Latency knobs (milliseconds unless noted):
+    STUB_LLM_TTFT_MS=300       delay before the first token
+    STUB_LLM_TOKEN_MS=15       delay between tokens
+    STUB_REPORT_TOKENS=200     length of report sections / single reports
+    STUB_SEARCH_MS=200         latency of one search call
+    STUB_JITTER=0.2            +/- fraction applied to every delay
+
+Flow knobs:
+    STUB_CLARIFY=1             ask one clarification question per session (0: answer CLEAR)
+    STUB_DIMENSIONS=3          core dimensions in the CoT
+    STUB_ROUNDS=2              research rounds before the supervisor terminates
+
+The stub recognises which node is calling from the prompt and answers in the
+shape that node parses, so the whole workflow runs (clarification, CoT,
+planning, search, sectioned report) without network access. All async delays
+are asyncio sleeps: the stub costs the event loop nothing (sync invoke sleeps
+the calling thread).
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from typing import AsyncIterator, List
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+DIMENSION_NAMES = ["市场格局", "技术前沿", "供应链", "政策环境", "竞争对手", "用户需求", "成本结构", "风险因素"]
+
+
+def _env_ms(name: str, default: float) -> float:
+    return float(os.getenv(name, default)) / 1000
+
+
+def _jittered(seconds: float) -> float:
+    jitter = float(os.getenv("STUB_JITTER", "0.2"))
+    return max(0.0, seconds * random.uniform(1 - jitter, 1 + jitter))
+
+
+def _filler(tokens: int, topic: str) -> str:
+    words = ["研究", "显示", topic, "的", "关键", "趋势", "与", "数据", "表明", "（[Source](https://example.com/stub)）"]
+    return " ".join(words[i % len(words)] for i in range(tokens))
+
+
+def stub_answer(text: str) -> str:
+    """Canned answer for a rendered prompt, shaped like what the calling node expects."""
+    dimensions = int(os.getenv("STUB_DIMENSIONS", "3"))
+    report_tokens = int(os.getenv("STUB_REPORT_TOKENS", "200"))
+
+    if "Research Clarification Expert" in text:
+        if os.getenv("STUB_CLARIFY", "1") == "0":
+            return "CLEAR"
+        return (
+            "**AI Insight**: Stub insight.\n\n**Please choose a research focus:**\n\n"
+            "**A. Market**: stub (Suitable for: Investors)\n\n**B. Tech**: stub (Suitable for: R&D)\n\n"
+            "**C. Supply Chain**: stub (Suitable for: Operations)\n\n**Question**: Which one?"
+        )
+    if "friendly assistant" in text:
+        return "Hello! (stub)"
+    if "Phase 1: Initial Architecture Design" in text:
+        lines = [f"{i}. **{DIMENSION_NAMES[(i - 1) % len(DIMENSION_NAMES)]}**: stub dimension {i}" for i in range(1, dimensions + 1)]
+        return "### 解析思路 (Analysis Logic)\nstub\n\n### 核心维度 (Core Dimensions)\n" + "\n".join(lines) + "\n\n### 执行策略 (Execution Strategy)\nstub"
+    if "Phase 2: Evaluation" in text:
+        match = re.search(r"Round: (\d+) / (\d+)", text)
+        current, limit = (int(match.group(1)), int(match.group(2))) if match else (0, 3)
+        done = current >= min(int(os.getenv("STUB_ROUNDS", "2")), limit)
+        return f"Updated CoT after round {current}: {_filler(60, 'stub')}\n\nDecision: {'TERMINATE' if done else 'CONTINUE'}"
+    if "Research Planner" in text:
+        match = re.search(r"Current Round: (\d+)", text)
+        round_count = match.group(1) if match else "1"
+        return f"**第 {round_count} 轮研究计划：**\n1. stub query a - a\n2. stub query b - b\n3. stub query c - c"
+    if "Extract the search queries" in text:
+        return json.dumps(["stub query a", "stub query b", "stub query c"])
+    if "writing ONE section" in text:
+        match = re.search(r"This Section: ([^\n(]+)", text)
+        title = match.group(1).strip() if match else "Section"
+        return f"## {title}\n\n{_filler(report_tokens, title)}"
+    if "sections of the report are already written" in text:
+        return f"## Executive Summary\n\n{_filler(max(report_tokens // 4, 10), 'summary')}"
+    return f"# Report\n\n{_filler(report_tokens, 'report')}"
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model that answers from stub_answer() after simulated network latency."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _answer(self, messages: List[BaseMessage]) -> str:
+        return stub_answer("\n".join(str(m.content) for m in messages))
+
+    def _usage(self, messages: List[BaseMessage], output: str) -> dict:
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        output_tokens = len(output) // 4
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _latency(self, output: str) -> float:
+        """Simulated time for a whole (non-streamed) answer: TTFT plus one delay per token."""
+        return _jittered(_env_ms("STUB_LLM_TTFT_MS", 300) + _env_ms("STUB_LLM_TOKEN_MS", 15) * len(output.split(" ")))
+
+    def _result(self, messages: List[BaseMessage], output: str) -> ChatResult:
+        message = AIMessage(content=output, usage_metadata=self._usage(messages, output))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        output = self._answer(messages)
+        time.sleep(self._latency(output))
+        return self._result(messages, output)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        output = self._answer(messages)
+        await asyncio.sleep(self._latency(output))
+        return self._result(messages, output)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        output = self._answer(messages)
+        token_delay = _env_ms("STUB_LLM_TOKEN_MS", 15)
+        await asyncio.sleep(_jittered(_env_ms("STUB_LLM_TTFT_MS", 300)))
+        tokens = output.split(" ")
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(_jittered(token_delay))
+            text = token if i == len(tokens) - 1 else token + " "
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, output)))
+
+
+class StubSearchProvider:
+    """Search provider returning synthetic results after STUB_SEARCH_MS."""
+
+    name = "stub"
+
+    async def search(self, query: str, max_results: int) -> list:
+        await asyncio.sleep(_jittered(_env_ms("STUB_SEARCH_MS", 200)))
+        return [
+            {
+                "title": f"Stub result {i} for {query}",
+                "url": f"https://example.com/stub/{i}?q={query}",
+                "content": f"{query}: " + _filler(80, query),
+                "score": 1.0 / (i + 1),
+                "provider": self.name,
+            }
+            for i in range(max_results)
+        ]
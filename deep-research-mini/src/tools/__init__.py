@@ -1,4 +1,4 @@
-from .web_search import web_search
+from .web_search import get_web_search
 from .web_crawl import web_crawl
 
-__all__ = ["web_search", "web_crawl"]
+__all__ = ["get_web_search", "web_crawl"]
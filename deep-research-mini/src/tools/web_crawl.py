@@ -1,6 +1,4 @@
 from langchain_core.tools import tool
-from firecrawl import FirecrawlApp
-import os
 
 @tool
 def web_crawl(url: str):
@@ -8,6 +6,15 @@ def web_crawl(url: str):
     Useful for crawling a specific website url and extracting its content.
     Input should be a valid url string.
     """
+    # Documents from the local search corpus are served from the index, not crawled
+    if url.startswith("local://"):
+        from src.search import get_provider
+        content = get_provider("local").index.read(url)
+        return content if content is not None else f"Error crawling {url}: not in the local index"
+
+    # Imported on first call: firecrawl pulls in a large dependency tree
+    from firecrawl import FirecrawlApp
+
     # FirecrawlApp will automatically look for FIRECRAWL_API_KEY in env
     app = FirecrawlApp()
     
@@ -1,7 +1,13 @@
-from langchain_tavily import TavilySearch
+from functools import lru_cache
 
-web_search = TavilySearch(
-    name="web_search",
-    max_results=5,
-    description="A search engine optimized for comprehensive, accurate, and trusted results. Useful for when you need to answer questions about current events. Input should be a search query string."
-)
+
+@lru_cache(maxsize=None)
+def get_web_search():
+    """Build the Tavily search tool on first use (langchain_tavily is slow to import)."""
+    from langchain_tavily import TavilySearch
+
+    return TavilySearch(
+        name="web_search",
+        max_results=5,
+        description="A search engine optimized for comprehensive, accurate, and trusted results. Useful for when you need to answer questions about current events. Input should be a search query string."
+    )
@@ -1,4 +1,8 @@
 import os
+import re
+from functools import lru_cache
+from typing import List
+
 from jinja2 import Template
 
 def apply_prompt_template(template_name: str, **kwargs) -> str:
@@ -24,3 +28,102 @@ def apply_prompt_template(template_name: str, **kwargs) -> str:
         raise FileNotFoundError(f"Template not found at: {template_path}")
     except Exception as e:
         raise Exception(f"Error rendering template {template_name}: {str(e)}")
+
+@lru_cache(maxsize=None)
+def _load_template(template_name: str) -> Template:
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    template_path = os.path.join(current_dir, "prompts", "templates", f"{template_name}.jinja-md")
+    with open(template_path, "r", encoding="utf-8") as f:
+        return Template(f.read())
+
+def apply_prompt_messages(template_name: str, **kwargs) -> list:
+    """
+    Render a template's `system` and `user` blocks as [SystemMessage, HumanMessage].
+
+    Layout for provider prefix caching: the system block holds only static
+    instructions, so it is byte-identical across calls of a node; the user block
+    starts with session context that stays stable across rounds (query, CoT) and
+    ends with the per-round data. Consecutive calls then share the longest prefix.
+    """
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    template = _load_template(template_name)
+    try:
+        context = template.new_context(kwargs)
+        system = "".join(template.blocks["system"](context)).strip()
+        user = "".join(template.blocks["user"](template.new_context(kwargs))).strip()
+    except KeyError as e:
+        raise Exception(f"Template {template_name} needs `system` and `user` blocks (missing {e})")
+    return [SystemMessage(content=system), HumanMessage(content=user)]
+
+
+# Numbered "Core Dimensions" lines of the supervisor CoT, e.g. "1. **[市场格局]**: 说明"
+# or with the colon inside the emphasis, "2. **政策环境：** 说明"
+_DIMENSION_LINE = re.compile(r"^\s*\d+[.、)]\s*(?:\*\*)?\[?(?P<title>[^\]*:：\n]+?)\]?(?:\*\*)?\s*(?:[:：]\s*(?:\*\*)?\s*(?P<description>.*))?$")
+
+def parse_dimensions(cot: str) -> List[dict]:
+    """
+    Extract the numbered entries of the "核心维度 (Core Dimensions)" section of a CoT
+    as [{"title": ..., "description": ...}]. Returns [] if the section is missing.
+    """
+    dimensions = []
+    in_section = False
+    for line in (cot or "").splitlines():
+        if line.lstrip().startswith("#"):
+            in_section = "核心维度" in line or "Core Dimensions" in line
+            continue
+        if not in_section:
+            continue
+        m = _DIMENSION_LINE.match(line)
+        if m:
+            dimensions.append({
+                "title": m.group("title").strip(),
+                "description": (m.group("description") or "").strip(),
+            })
+    return dimensions
+
+
+_LATIN_TERM = re.compile(r"[A-Za-z][A-Za-z0-9\-]{2,}")
+_CJK_RUN = re.compile(r"[\u4e00-\u9fff]+")
+
+def _relevance_terms(text: str) -> set:
+    """Latin words and CJK bigrams of a dimension title/description."""
+    terms = {w.lower() for w in _LATIN_TERM.findall(text)}
+    for run in _CJK_RUN.findall(text):
+        terms.update(run[i:i + 2] for i in range(max(len(run) - 1, 1)))
+    return terms
+
+def select_findings(gathered: List[str], dimension: dict, budget: int = 12000) -> str:
+    """
+    Pick the findings relevant to one report section, up to `budget` characters.
+    Fan-out findings are tagged "## Dimension: ..." and matched by title; otherwise
+    each "Query: ..." block is scored by overlap with the dimension's terms.
+    """
+    blocks = []  # (dimension label or None, block text)
+    for text in gathered:
+        current = None
+        for part in re.split(r"\n(?=## Dimension: )", text):
+            if part.startswith("## Dimension: "):
+                header, _, part = part.partition("\n")
+                current = header[len("## Dimension: "):]
+            blocks.extend((current, block.strip()) for block in re.split(r"\n\n(?=Query: )", part) if block.strip())
+
+    # Labels are "title" or "title: description" (see route_supervisor); a bare prefix
+    # match would also give "市场" the findings of "市场格局"
+    title = dimension["title"]
+    candidates = [block for label, block in blocks if label == title or (label or "").startswith(title + ": ")]
+    if not candidates:
+        terms = _relevance_terms(f"{dimension['title']} {dimension.get('description', '')}")
+        scored = [(sum(block.lower().count(t) for t in terms), i, block) for i, (_, block) in enumerate(blocks)]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        candidates = [block for score, _, block in scored if score > 0] or [block for _, block in blocks]
+
+    selected, used = [], 0
+    for block in candidates:
+        if selected and used + len(block) > budget:
+            break
+        # A single oversized result must not blow the section prompt up to full-report size
+        block = block[:budget]
+        selected.append(block)
+        used += len(block)
+    return "\n\n".join(selected)
@@ -2,25 +2,41 @@ import asyncio
 import sys
 import os
 import json
+import uuid
 
 # Ensure the deep-research-mini directory is in the python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.join(current_dir, "deep-research-mini"))
 
-from src.agents.workflow import builder
-from src.models import chat_model
-from src.utils import apply_prompt_template
+from src.agents.workflow import builder, run_settings
+from src.event_log import EventLog, EventRecorder
+from src.state_store import MeasuredMemorySaver, get_blob_store
+from src.model_router import get_router
 from langchain_core.messages import AIMessage, HumanMessage
-from langgraph.checkpoint.memory import MemorySaver
+
+# Graph nodes and tools the CLI reacts to; everything else is filtered out of astream_events
+WORKFLOW_NODES = ["supervisor", "planner", "reporter", "researcher", "check_clarity", "dimension_research", "merge_findings"]
+WATCHED_TOOLS = ["web_search", "web_crawl"]
 
 async def run_deep_research(user_input: str):
     print(f"🚀 Starting workflow on: {user_input}\n")
     
     # We use a thread_id to maintain state across clarification turns
     config = {"configurable": {"thread_id": "1"}}
+    # Pin env-derived settings (RESEARCH_FANOUT, REPORT_MODE, ...) so the session log records them
+    config["configurable"].update(run_settings(config))
+    # Large search findings stay out of the checkpoints until the run ends (released below)
+    get_blob_store().claim(config["configurable"]["thread_id"])
+
+    # Record every graph event to an append-only session log (replay with `python -m src.replay`)
+    event_log = EventLog.for_session(uuid.uuid4().hex)
+    config["callbacks"] = [EventRecorder(event_log, config)]
+    print(f"📝 Session log: {event_log.path}\n")
     
-    # Initialize checkpointer and compile graph locally
-    checkpointer = MemorySaver()
+    # Initialize checkpointer and compile graph locally (per-step checkpoint sizes go to the session log)
+    checkpointer = MeasuredMemorySaver(
+        on_checkpoint=lambda thread_id, record: event_log.append("checkpoint", **record)
+    )
     graph = builder.compile(checkpointer=checkpointer)
     
     # Initial input
@@ -33,17 +49,26 @@ async def run_deep_research(user_input: str):
         collected_urls = set()
         supervisor_ran = False
         last_ai_message = None
+        report_sectioned = False
 
         # Run the graph (streaming events)
-        # We use astream_events to visualize progress
-        async for event in graph.astream_events(current_input, version="v2", config=config):
+        # We use astream_events to visualize progress, filtered to node, tool and chat model events
+        async for event in graph.astream_events(
+            current_input, version="v2", config=config,
+            include_names=WORKFLOW_NODES + WATCHED_TOOLS, include_types=["chat_model"],
+        ):
             kind = event["event"]
             name = event["name"]
             data = event["data"]
+            # Fan-out mode: planners inside the parallel dimension_research branches stream
+            # concurrently, so their tokens would interleave; their plans are printed merged instead
+            metadata = event.get("metadata", {})
+            in_dimension = (metadata.get("langgraph_checkpoint_ns", "").startswith("dimension_research:")
+                            and metadata.get("langgraph_node") != "dimension_research")
 
             # Track Current Node
             if kind == "on_chain_start":
-                if name in ["supervisor", "planner", "reporter", "researcher", "check_clarity"]:
+                if name in WORKFLOW_NODES and not in_dimension:
                     current_node = name
             elif kind == "on_chain_end":
                 if name == current_node:
@@ -96,6 +121,18 @@ async def run_deep_research(user_input: str):
                 #         # Just print the content directly, it's already formatted by the prompt
                 #         print(f"\n{last_msg.content}")
 
+            # --- 2.1 Capture: Per-dimension plans (fan-out mode) ---
+            elif kind == "on_chain_end" and name == "merge_findings":
+                output = data.get("output")
+                if output and isinstance(output, dict) and output.get("current_plan"):
+                    print(f"\n{output['current_plan']}")
+
+            # --- 2.2 Capture: Sectioned report (sections stream concurrently, so print it whole) ---
+            elif kind == "on_chain_end" and name == "reporter" and report_sectioned:
+                output = data.get("output")
+                if output and isinstance(output, dict) and output.get("messages"):
+                    print(f"\n{output['messages'][-1].content}")
+
             # --- 2.5 Capture: Researcher Output (Hidden) ---
             elif kind == "on_chain_end" and name == "researcher":
                 pass
@@ -114,8 +151,12 @@ async def run_deep_research(user_input: str):
 
             # --- 3. Capture: Real-time streaming from the model ---
             elif kind == "on_chat_model_stream":
+                if any(tag.startswith("section:") for tag in event.get("tags", [])):
+                    report_sectioned = True
+                elif in_dimension:
+                    pass
                 # Only stream output for specific nodes
-                if current_node in ["supervisor", "planner", "reporter", "check_clarity"]:
+                elif current_node in ["supervisor", "planner", "reporter", "check_clarity"]:
                     content = data.get("chunk", {}).content if isinstance(data.get("chunk"), dict) == False else data.get("chunk").get("content")
                     # Safety check for chunk object access
                     if "chunk" in data and hasattr(data["chunk"], "content"):
@@ -128,6 +169,7 @@ async def run_deep_research(user_input: str):
         if supervisor_ran:
             # Research completed
             print("\n✅ Research Completed!")
+            print(f"\n⏱️ Model route latencies:\n{get_router().format_stats()}")
             if collected_urls:
                 print("\n📚 Sources used:")
                 for url in collected_urls:
@@ -154,6 +196,9 @@ async def run_deep_research(user_input: str):
             else:
                 break
 
+    event_log.close()
+    get_blob_store().release(config["configurable"]["thread_id"])
+
 if __name__ == "__main__":
     # Get user input from console
     print("Welcome to Deep Research Agent!")
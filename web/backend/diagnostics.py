@@ -0,0 +1,166 @@
+"""
+Event-loop diagnostics for a live backend worker.
+
+Every session shares one event loop, so any synchronous work on it (a blocking
+call, a large serialization, a burst of prints) stalls all the others.
+
+- LoopMonitor: a task that wakes up every `interval` and records how late it
+  woke (event-loop lag) in a histogram, plus a watchdog thread. When the loop
+  has not ticked for longer than `slow_threshold`, the watchdog captures the
+  loop thread's stack *while it is still blocked*, so the record shows the
+  code that blocked rather than the code that ran next.
+- sample_profile: time-boxed sampling profiler over sys._current_frames(),
+  returning folded stacks ("frame;frame;frame count"), the input format of
+  flamegraph.pl, speedscope and inferno.
+
+Served by the /admin/loop and /admin/profile endpoints in main.py.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Optional
+
+# Histogram bucket upper bounds, in milliseconds
+LAG_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+STACK_DEPTH = 40
+# Leaf frames of a loop waiting for I/O: selectors for asyncio's loop; under uvloop the
+# poll happens in C, so the innermost Python frame is asyncio.run itself
+IDLE_LEAVES = {("selectors.py", "select"), ("selectors.py", "poll"), ("runners.py", "run")}
+
+
+class LagHistogram:
+    def __init__(self, window: int = 1000):
+        self.counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)  # for percentiles
+
+    def add(self, lag_ms: float) -> None:
+        index = next((i for i, bound in enumerate(LAG_BUCKETS_MS) if lag_ms <= bound), len(LAG_BUCKETS_MS))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += lag_ms
+        self.max = max(self.max, lag_ms)
+        self.recent.append(lag_ms)
+
+    def snapshot(self) -> dict:
+        recent = sorted(self.recent)
+
+        def pct(q):
+            return round(recent[min(len(recent) - 1, int(q * (len(recent) - 1)))], 2) if recent else None
+
+        labels = [f"<={bound}ms" for bound in LAG_BUCKETS_MS] + [f">{LAG_BUCKETS_MS[-1]}ms"]
+        return {
+            "samples": self.count,
+            "mean_ms": round(self.total / self.count, 2) if self.count else None,
+            "max_ms": round(self.max, 2),
+            "recent_p50_ms": pct(0.5), "recent_p99_ms": pct(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+def _format_frame(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.1, slow_threshold: float = 0.25, keep: int = 50):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.histogram = LagHistogram()
+        self.slow_callbacks = deque(maxlen=keep)  # most recent stalls, with stacks
+        self.loop_thread_id: Optional[int] = None
+        self._beat = time.perf_counter()
+        self._seq = 0
+        self._captured_seq = -1
+        self._pending: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Start monitoring the running loop (call from inside it)."""
+        self.loop_thread_id = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._task = asyncio.create_task(self._tick())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _tick(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag_ms = max(0.0, now - expected) * 1000
+            self.histogram.add(lag_ms)
+            pending, self._pending = self._pending, None
+            if pending is not None:
+                # The watchdog caught this stall in progress; now we know how long it lasted
+                pending["blocked_ms"] = round(lag_ms, 1)
+            self._beat = now
+            self._seq += 1
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.slow_threshold / 4):
+            seq = self._seq
+            stalled = time.perf_counter() - self._beat - self.interval
+            if stalled < self.slow_threshold or seq == self._captured_seq:
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            stack = [_format_frame(f) for f, _ in traceback.walk_stack(frame)][:STACK_DEPTH]
+            record = {
+                "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "blocked_ms": None,  # filled in when the loop ticks again
+                "stack": stack,  # innermost frame first
+            }
+            self._captured_seq = seq
+            self.slow_callbacks.append(record)
+            self._pending = record
+            print(f"[LOOP MONITOR] Event loop blocked > {self.slow_threshold * 1000:.0f} ms in {' <- '.join(stack[:3])}")
+
+    def snapshot(self) -> dict:
+        return {
+            "interval_ms": self.interval * 1000,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "lag": self.histogram.snapshot(),
+            "slow_callbacks": list(self.slow_callbacks),
+        }
+
+
+def sample_profile(duration: float, interval: float = 0.005, thread_id: Optional[int] = None,
+                   include_idle: bool = False) -> str:
+    """
+    Sample thread stacks for `duration` seconds and return them folded, one
+    "root;...;leaf count" line per distinct stack. Samples only `thread_id` if
+    given (e.g. the event-loop thread), otherwise every thread, rooted at its name.
+    Blocking: run it in a worker thread.
+    """
+    names = {t.ident: t.name for t in threading.enumerate()}
+    own = threading.get_ident()
+    folded = Counter()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (thread_id is not None and ident != thread_id):
+                continue
+            leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+            if not include_idle and leaf in IDLE_LEAVES:
+                continue
+            frames = [f"{f.f_code.co_name} ({os.path.basename(f.f_code.co_filename)})" for f, _ in traceback.walk_stack(frame)]
+            frames.reverse()
+            if thread_id is None:
+                frames.insert(0, names.get(ident, str(ident)))
+            folded[";".join(frames)] += 1
+        time.sleep(interval)
+    return "\n".join(f"{stack} {count}" for stack, count in folded.most_common())
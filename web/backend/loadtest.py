@@ -0,0 +1,258 @@
+"""
+Load generator for the research WebSocket endpoint.
+
+Opens N concurrent sessions against /ws/{session_id}. Each session sends
+`start_research` and answers clarification questions with scripted answers
+(`clarify_answer`). Per session it records:
+    connect   WebSocket handshake time
+    plan      start_research -> first plan
+    token     start_research -> first streamed report token (protocol v2 only)
+    report    start_research -> final report
+All timings include the scripted clarification round trip.
+
+Run it against a backend wired to the stub LLM and search backends
+(deep-research-mini/src/stubs.py), so nothing leaves the machine:
+
+    cd web/backend
+    STUB_LLM=1 SEARCH_PROVIDERS=stub STUB_LLM_TOKEN_MS=20 python main.py
+    python loadtest.py -n 50 --sessions 200
+    python loadtest.py --sweep 1,10,25,50,100   # find the concurrency knee
+
+or let the tool start (and stop) the stubbed backend itself:
+
+    python loadtest.py --spawn-backend --sweep 1,10,50 --stub-env STUB_SEARCH_MS=500
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from typing import Optional
+
+import websockets
+
+try:
+    import msgpack
+except ImportError:  # only needed for --encoding msgpack
+    msgpack = None
+
+METRICS = ("connect", "plan", "token", "report")
+
+
+class SessionResult:
+    def __init__(self):
+        self.timings = {}  # metric -> seconds
+        self.clarifications = 0
+        self.frames = 0
+        self.error: Optional[str] = None
+
+
+def percentile(values: list, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def session_url(base_url: str, session_id: str, protocol: int, encoding: str) -> str:
+    url = f"{base_url.rstrip('/')}/ws/{session_id}"
+    if protocol == 2:
+        url += f"?protocol=2&encoding={encoding}"
+    return url
+
+
+async def receive(ws) -> dict:
+    raw = await ws.recv()
+    if isinstance(raw, bytes):
+        return msgpack.unpackb(raw)
+    return json.loads(raw)
+
+
+async def run_session(args, index: int) -> SessionResult:
+    result = SessionResult()
+    session_id = f"load-{uuid.uuid4().hex[:12]}"
+    answers = args.answers.split(",")
+    started = time.perf_counter()
+    try:
+        async with websockets.connect(
+            session_url(args.url, session_id, args.protocol, args.encoding),
+            open_timeout=args.timeout, max_size=None,
+        ) as ws:
+            result.timings["connect"] = time.perf_counter() - started
+            request = {"type": "start_research", "query": args.query}
+            if args.fanout:
+                request["fanout"] = True
+            t0 = time.perf_counter()
+            await ws.send(json.dumps(request))
+
+            async def drive():
+                while True:
+                    frame = await receive(ws)
+                    result.frames += 1
+                    kind = frame.get("t") or frame.get("type")
+                    elapsed = time.perf_counter() - t0
+                    if kind in ("clar", "clarify"):
+                        answer = answers[(index + result.clarifications) % len(answers)]
+                        result.clarifications += 1
+                        if args.think_ms:
+                            await asyncio.sleep(args.think_ms / 1000)
+                        await ws.send(json.dumps({"type": "clarify_answer", "answer": answer}))
+                    elif kind == "plan":
+                        result.timings.setdefault("plan", elapsed)
+                    elif kind == "tok" and frame.get("n") == "reporter":
+                        result.timings.setdefault("token", elapsed)
+                    elif kind in ("res", "result"):
+                        result.timings["report"] = elapsed
+                        return
+                    elif kind in ("err", "error"):
+                        raise RuntimeError(f"server error: {frame.get('m') or frame.get('message')}")
+
+            await asyncio.wait_for(drive(), args.timeout)
+    except asyncio.TimeoutError:
+        result.error = "timeout"
+    except websockets.ConnectionClosed as e:
+        result.error = f"closed ({e.rcvd.code if e.rcvd else 'no close frame'})"
+    except (OSError, websockets.InvalidHandshake) as e:
+        result.error = f"connect: {type(e).__name__}"
+    except RuntimeError as e:
+        result.error = str(e)[:80]
+    return result
+
+
+async def run_level(args, concurrency: int, total: int) -> dict:
+    """Run `total` sessions with at most `concurrency` in flight."""
+    gate = asyncio.Semaphore(concurrency)
+    ramp = args.ramp / concurrency if args.ramp else 0
+
+    async def one(index: int) -> SessionResult:
+        if ramp and index < concurrency:
+            await asyncio.sleep(index * ramp)
+        async with gate:
+            return await run_session(args, index)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(total)))
+    wall = time.perf_counter() - started
+
+    summary = {"concurrency": concurrency, "sessions": total, "wall_s": wall,
+               "ok": sum(1 for r in results if r.error is None), "errors": {}}
+    for r in results:
+        if r.error:
+            summary["errors"][r.error] = summary["errors"].get(r.error, 0) + 1
+    summary["error_rate"] = 1 - summary["ok"] / total if total else 0.0
+    summary["throughput"] = summary["ok"] / wall if wall else 0.0
+    for metric in METRICS:
+        values = [r.timings[metric] for r in results if metric in r.timings]
+        summary[metric] = {
+            "n": len(values),
+            "p50": percentile(values, 0.5), "p90": percentile(values, 0.9),
+            "p99": percentile(values, 0.99), "max": max(values) if values else None,
+        }
+    return summary
+
+
+def print_level(summary: dict) -> None:
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.0f}"
+
+    print(f"\n=== concurrency {summary['concurrency']}: {summary['ok']}/{summary['sessions']} ok, "
+          f"error rate {summary['error_rate']:.1%}, {summary['throughput']:.2f} sessions/s, wall {summary['wall_s']:.1f}s")
+    print(f"{'metric':<10}{'n':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for metric in METRICS:
+        row = summary[metric]
+        print(f"{metric:<10}{row['n']:>6}{ms(row['p50']):>10}{ms(row['p90']):>10}{ms(row['p99']):>10}{ms(row['max']):>10}")
+    for error, count in sorted(summary["errors"].items(), key=lambda item: -item[1]):
+        print(f"  error: {error} x{count}")
+
+
+def print_sweep(summaries: list) -> None:
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.0f}"
+
+    print(f"\n{'conc':>6}{'ok':>7}{'err%':>7}{'sess/s':>8}{'connect p90':>13}{'plan p50':>10}{'token p50':>11}{'report p50':>12}{'report p99':>12}")
+    for s in summaries:
+        print(f"{s['concurrency']:>6}{s['ok']:>7}{s['error_rate'] * 100:>6.1f}%{s['throughput']:>8.2f}"
+              f"{ms(s['connect']['p90']):>13}{ms(s['plan']['p50']):>10}{ms(s['token']['p50']):>11}"
+              f"{ms(s['report']['p50']):>12}{ms(s['report']['p99']):>12}")
+
+
+def spawn_backend(args) -> subprocess.Popen:
+    """Start web/backend/main.py with the stub LLM and search backends."""
+    env = dict(os.environ, STUB_LLM="1", SEARCH_PROVIDERS="stub", PYTHONUNBUFFERED="1")
+    for item in args.stub_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    backend = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    log = open(args.backend_log, "w") if args.backend_log else subprocess.DEVNULL
+    print(f"Starting stubbed backend: {backend} (log: {args.backend_log or 'discarded'})")
+    return subprocess.Popen([sys.executable, backend], env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+async def wait_for_backend(url: str, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            async with websockets.connect(session_url(url, "load-probe", 1, "json"), open_timeout=2):
+                return
+        except (OSError, websockets.InvalidHandshake):
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"Backend at {url} did not come up within {timeout:.0f}s")
+            await asyncio.sleep(0.5)
+
+
+async def main_async(args) -> list:
+    levels = [int(n) for n in args.sweep.split(",")] if args.sweep else [args.concurrency]
+    summaries = []
+    for concurrency in levels:
+        total = args.sessions or concurrency
+        summary = await run_level(args, concurrency, max(total, concurrency))
+        print_level(summary)
+        summaries.append(summary)
+    if len(summaries) > 1:
+        print_sweep(summaries)
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent WebSocket load test for the research backend.")
+    parser.add_argument("--url", default="ws://localhost:8000", help="Backend base URL")
+    parser.add_argument("-n", "--concurrency", type=int, default=10, help="Concurrent sessions")
+    parser.add_argument("--sessions", type=int, default=0, help="Total sessions per level (default: = concurrency)")
+    parser.add_argument("--sweep", help="Comma-separated concurrency levels, e.g. 1,10,50,100")
+    parser.add_argument("--ramp", type=float, default=0.0, help="Seconds over which to start the first wave")
+    parser.add_argument("--query", default="固态电池的产业化进展", help="start_research query")
+    parser.add_argument("--answers", default="A,B,C", help="Scripted clarification answers, used round-robin")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Delay before answering a clarification")
+    parser.add_argument("--protocol", type=int, choices=(1, 2), default=2)
+    parser.add_argument("--encoding", choices=("json", "msgpack"), default="json")
+    parser.add_argument("--fanout", action="store_true", help="Request per-dimension fan-out research")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-session timeout (seconds)")
+    parser.add_argument("--json", dest="json_out", help="Write the level summaries to this file")
+    parser.add_argument("--spawn-backend", action="store_true", help="Start a stubbed backend for the run")
+    parser.add_argument("--stub-env", action="append", default=[], help="KEY=VALUE for the spawned backend (repeatable)")
+    parser.add_argument("--backend-log", help="Where the spawned backend's output goes")
+    args = parser.parse_args()
+    if args.encoding == "msgpack" and msgpack is None:
+        parser.error("--encoding msgpack needs the `msgpack` package")
+
+    backend = spawn_backend(args) if args.spawn_backend else None
+    try:
+        if backend:
+            asyncio.run(wait_for_backend(args.url))
+        summaries = asyncio.run(main_async(args))
+    finally:
+        if backend:
+            backend.terminate()
+            backend.wait(timeout=10)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, indent=2)
+        print(f"\nSaved summaries to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 
 import asyncio
+import hmac
 import os
 import sys
 import json
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
-from starlette.responses import FileResponse
+from starlette.responses import FileResponse, PlainTextResponse
+from starlette.websockets import WebSocketState
 import uvicorn
 from langchain_core.messages import HumanMessage, AIMessage
 import re
@@ -29,14 +33,43 @@ def normalize_answer(ans: str) -> str:
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(os.path.dirname(current_dir))
 sys.path.append(os.path.join(project_root, "deep-research-mini"))
+# protocol.py / diagnostics.py live next to this file; make them importable from any cwd
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
 
-from src.agents.workflow import builder
-from langgraph.checkpoint.memory import MemorySaver
+from src.agents.workflow import builder, run_settings
+from src.event_log import EventLog, EventRecorder
+from src.state_store import MeasuredMemorySaver, get_blob_store
+from src.model_router import get_router
+from protocol import FrameWriter, SlowClient
+from diagnostics import LoopMonitor, sample_profile
+
+# --- Event-Loop Diagnostics (see diagnostics.py) ---
+# LOOP_MONITOR=0 disables the lag sampler and slow-callback watchdog
+loop_monitor = LoopMonitor(
+    interval=float(os.getenv("LOOP_LAG_INTERVAL_MS", "100")) / 1000,
+    slow_threshold=float(os.getenv("SLOW_CALLBACK_MS", "250")) / 1000,
+)
+profile_lock = asyncio.Lock()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.getenv("LOOP_MONITOR", "1") != "0":
+        loop_monitor.start()
+    yield
+    loop_monitor.stop()
 
 # --- FastAPI App Initialization ---
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 sessions = {}
 
+# --- Protocol v2 Settings (see protocol.py) ---
+WS_FLUSH_MS = int(os.getenv("WS_FLUSH_MS", "50"))
+WS_MAX_QUEUE = int(os.getenv("WS_MAX_QUEUE", "64"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+# Nodes whose LLM tokens are streamed to v2 clients as "tok" deltas
+STREAM_NODES = {"reporter"}
+
 # --- Data Serialization Helper ---
 def serialize_event(event: dict) -> dict:
     if isinstance(event, dict):
@@ -47,17 +80,115 @@ def serialize_event(event: dict) -> dict:
         return event.dict()
     return event
 
+# --- Protocol v2 Streaming ---
+async def stream_research_v2(graph, current_input: dict, config: dict, writer: FrameWriter):
+    """
+    Run the graph and emit v2 frames. Only node updates, LLM tokens and report
+    sections are streamed (stream_mode=["updates", "messages", "custom"]), not
+    every callback event.
+    """
+    streamed = {}  # (node, section) -> token texts already sent as deltas
+    sections = {}  # section index -> finished section text
+    async for mode, chunk in graph.astream(current_input, config=config, stream_mode=["updates", "messages", "custom"]):
+        if mode == "messages":
+            message, metadata = chunk
+            node = metadata.get("langgraph_node")
+            if node in STREAM_NODES and isinstance(message.content, str) and message.content:
+                # The sectioned reporter tags each concurrent section call with "section:<i>"
+                section = next((int(tag.split(":", 1)[1]) for tag in metadata.get("tags", []) if tag.startswith("section:")), None)
+                if section is None and any(key[0] == node and key[1] is not None for key in streamed):
+                    # The assembled report the node returns; the client already has it section by section
+                    continue
+                writer.delta(node, message.content, section)
+                streamed.setdefault((node, section), []).append(message.content)
+            continue
+
+        if mode == "custom":
+            if isinstance(chunk, dict) and "section" in chunk:
+                index, content = chunk["section"], chunk["content"]
+                sections[index] = content
+                frame = {"t": "sec", "i": index, "h": chunk.get("title", "")}
+                if "".join(streamed.get(("reporter", index), [])) == content:
+                    frame["len"] = len(content)
+                else:
+                    frame["c"] = content
+                await writer.send(frame)
+            continue
+
+        (node_name, node_output), = chunk.items()
+        node_output = node_output or {}
+
+        messages = node_output.get("messages", [])
+        if messages and isinstance(messages[-1], AIMessage):
+            if "Please choose a research focus:" in messages[-1].content:
+                await writer.send({"t": "clar", "c": messages[-1].content})
+
+        plan = node_output.get("current_plan")
+        if plan:
+            await writer.send({"t": "plan", "c": plan})
+
+        if node_name == "reporter" and messages:
+            report = messages[-1].content
+            if sections:
+                # Sections arrive in completion order; the report is them in outline order
+                assembled = "\n\n".join(sections[i] for i in sorted(sections))
+            else:
+                assembled = "".join(streamed.get(("reporter", None), []))
+            if assembled == report:
+                # The client already holds the report from the "tok" deltas
+                await writer.send({"t": "res", "len": len(report)})
+            else:
+                await writer.send({"t": "res", "c": report})
+
+    await writer.send({"t": "done"})
+
+async def release_session(session_id: str):
+    """Drop a session's state, its in-memory blobs and close its event log (however the connection ended)."""
+    session = sessions.pop(session_id, None)
+    get_blob_store().release(session_id)
+    if session:
+        await asyncio.to_thread(session["event_log"].close)
+
 # --- WebSocket Endpoint ---
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     await websocket.accept()
     print(f"\n[BACKEND LOG] 1. WebSocket connection established for session: {session_id}")
 
+    # Protocol negotiation: v1 (default) sends whole JSON payloads, v2 uses FrameWriter
+    writer = None
+    if websocket.query_params.get("protocol") == "2":
+        try:
+            writer = FrameWriter(
+                websocket,
+                encoding=websocket.query_params.get("encoding", "json"),
+                flush_interval=WS_FLUSH_MS / 1000,
+                max_queue=WS_MAX_QUEUE,
+                send_timeout=WS_SEND_TIMEOUT,
+            )
+        except ValueError as e:
+            await websocket.close(code=1003, reason=str(e))
+            return
+        await writer.hello()
+
     if session_id not in sessions:
-        sessions[session_id] = {"checkpointer": MemorySaver()}
+        event_log = EventLog.for_session(session_id)
+        # Large search findings live in the blob store until release_session
+        get_blob_store().claim(session_id)
+        sessions[session_id] = {
+            "event_log": event_log,
+            # Per-step checkpoint write sizes go to the session log
+            "checkpointer": MeasuredMemorySaver(
+                on_checkpoint=lambda thread_id, record: event_log.append("checkpoint", **record)
+            ),
+        }
     
     graph = builder.compile(checkpointer=sessions[session_id]["checkpointer"])
     config = {"configurable": {"thread_id": session_id}}
+    # Pin env-derived settings (RESEARCH_FANOUT, REPORT_MODE, ...); the recorder logs them with each run
+    config["configurable"].update(run_settings(config))
+    # Record every graph event to the session's append-only log (replay with `python -m src.replay`)
+    config["callbacks"] = [EventRecorder(sessions[session_id]["event_log"], config)]
 
     try:
         while True:
@@ -70,6 +201,12 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
 
                 if message_type == "start_research":
                     query = data.get("query")
+                    if data.get("search_providers"):
+                        # Per-session search backends, e.g. ["local", "tavily"] (see src/search)
+                        config["configurable"]["search_providers"] = data["search_providers"]
+                    if "fanout" in data:
+                        # Research the CoT's core dimensions in parallel subgraphs
+                        config["configurable"]["fanout"] = bool(data["fanout"])
                     current_input = {"messages": [HumanMessage(content=query)]}
                 elif message_type == "clarify_answer":
                     raw_answer = data.get("answer")
@@ -77,7 +214,10 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                     current_input = {"messages": [HumanMessage(content=normalized_answer)]}
                     print(f"\n[BACKEND LOG] Normalized user answer ''{raw_answer}'' to ''{normalized_answer}''")
 
-                if current_input:
+                if current_input and writer:
+                    print(f"\n[BACKEND LOG] Invoking graph (protocol v2) for thread_id={session_id}")
+                    await stream_research_v2(graph, current_input, config, writer)
+                elif current_input:
                     print(f"\n[BACKEND LOG] Invoking graph for thread_id={session_id} with input: {current_input['messages'][0].content[:50]}...")
                     async for event in graph.astream(current_input, config=config):
                         (node_name, node_output), = event.items()
@@ -92,8 +232,8 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                                 await websocket.send_json(response)
                                 print(f"[BACKEND LOG] Sent clarification question.")
 
-                        # Check for plan
-                        if node_name == "planner":
+                        # Check for plan (merge_findings carries the merged per-dimension plans in fan-out mode)
+                        if node_name in ("planner", "merge_findings"):
                             plan = node_output.get("current_plan", "")
                             if plan:
                                 response = {"type": "plan", "content": plan.splitlines()}
@@ -108,28 +248,97 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                                 response = {"type": "result", "content": report}
                                 await websocket.send_json(response)
                                 print(f"[BACKEND LOG] Sent final report.")
+                if current_input:
+                    print(f"[BACKEND LOG] Checkpoint sizes for {session_id}:\n{sessions[session_id]['checkpointer'].format_sizes(session_id)}")
+                    print(f"[BACKEND LOG] Model route latencies:\n{get_router().format_stats()}")
+            except (WebSocketDisconnect, SlowClient):
+                raise
             except Exception as e:
                 import traceback
                 traceback.print_exc()
-                await websocket.send_json({"type": "error", "message": str(e), "trace_id": session_id})
+                if writer:
+                    await writer.send({"t": "err", "m": str(e), "id": session_id})
+                else:
+                    await websocket.send_json({"type": "error", "message": str(e), "trace_id": session_id})
                 continue
 
 
 
     except WebSocketDisconnect:
         print(f"WebSocket disconnected for session: {session_id}")
-        if session_id in sessions: del sessions[session_id]
+    except SlowClient as e:
+        # Backpressure: drop a client that cannot keep up rather than buffer without limit
+        print(f"[BACKEND LOG] Dropping slow client for session {session_id}: {e}")
+        if websocket.client_state == WebSocketState.CONNECTED:
+            try:
+                await websocket.close(code=1013, reason="Client too slow")
+            except (RuntimeError, WebSocketDisconnect):
+                pass  # the client went away while we were closing
     except Exception as e:
         print(f"An error occurred: {e}")
         # Add a traceback for more detailed server-side logging
         import traceback
         traceback.print_exc()
         await websocket.send_json({"type": "error", "message": f"An unexpected error occurred: {e}", "trace_id": session_id})
+    finally:
+        if writer:
+            await writer.close()
+        await release_session(session_id)
+
+# --- Stats ---
+@app.get("/api/stats/models")
+async def model_stats():
+    """Per-route (task/profile) model latency statistics since startup."""
+    return get_router().latency_stats()
+
+# --- Admin: Diagnostics ---
+def require_admin(request: Request):
+    """
+    Admin endpoints need ADMIN_TOKEN (header X-Admin-Token or ?token=). Without it they do
+    not exist (404), unless ADMIN_ALLOW_LOCALHOST=1 opts in to loopback clients. Behind a
+    reverse proxy every request comes from loopback, so only use that for local debugging.
+    """
+    token = os.getenv("ADMIN_TOKEN")
+    if token:
+        supplied = request.headers.get("x-admin-token") or request.query_params.get("token") or ""
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            raise HTTPException(status_code=403, detail="Invalid admin token")
+    elif os.getenv("ADMIN_ALLOW_LOCALHOST") == "1":
+        if request.client is None or request.client.host not in ("127.0.0.1", "::1", "localhost"):
+            raise HTTPException(status_code=403, detail="Admin endpoints are localhost-only without ADMIN_TOKEN")
+    else:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@app.get("/admin/loop")
+async def admin_loop(request: Request):
+    """Event-loop lag histogram and the latest slow callbacks (with the stacks that blocked)."""
+    require_admin(request)
+    return loop_monitor.snapshot()
+
+@app.get("/admin/profile")
+async def admin_profile(request: Request, seconds: float = 10.0, interval_ms: float = 5.0, threads: str = "loop", idle: bool = False):
+    """
+    Time-boxed sampling profile of this worker, as folded stacks:
+        curl -H "X-Admin-Token: $ADMIN_TOKEN" 'localhost:8000/admin/profile?seconds=15' > out.folded
+        flamegraph.pl out.folded > loop.svg
+    threads=loop samples only the event-loop thread, threads=all every thread.
+    """
+    require_admin(request)
+    if not 0 < seconds <= 60:
+        raise HTTPException(status_code=400, detail="seconds must be in (0, 60]")
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already being captured")
+    async with profile_lock:
+        thread_id = (loop_monitor.loop_thread_id or threading.get_ident()) if threads == "loop" else None
+        # The sampler runs in a worker thread; the loop keeps serving while it is observed
+        folded = await asyncio.to_thread(sample_profile, seconds, max(interval_ms, 1.0) / 1000, thread_id, idle)
+    return PlainTextResponse(folded)
 
 # --- Static Files & Root ---
-app.mount("/static", StaticFiles(directory=os.path.join(current_dir, "../frontend/build/static")), name="static")
+# check_dir=False: the backend must start (and import) even before the frontend is built
+app.mount("/static", StaticFiles(directory=os.path.join(current_dir, "../frontend/build/static"), check_dir=False), name="static")
 
-@app.route("/{full_path:path}", methods=["GET", "POST"])
+@app.api_route("/{full_path:path}", methods=["GET", "POST"])
 async def serve_react_app(full_path: str):
     index_path = os.path.join(current_dir, "../frontend/build/index.html")
     if os.path.exists(index_path):
@@ -139,4 +348,5 @@ async def serve_react_app(full_path: str):
 # --- Main Entry Point ---
 if __name__ == "__main__":
     print("Starting FastAPI server with detailed logging...")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # permessage-deflate is negotiated when the client offers it; set WS_PER_MESSAGE_DEFLATE=0 to disable
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws_per_message_deflate=os.getenv("WS_PER_MESSAGE_DEFLATE", "1") != "0")
@@ -0,0 +1,147 @@
+"""
+WebSocket protocol v2: small typed frames, coalesced token deltas, backpressure.
+
+Clients opt in with query parameters on the socket URL:
+    /ws/{session_id}?protocol=2[&encoding=msgpack]
+
+Without them the server speaks the original v1 protocol (whole JSON payloads).
+Client -> server messages stay JSON text in both versions.
+
+v2 frames (server -> client). Every frame has a one-letter-ish type `t`:
+    {"t": "hello", "v": 2, "enc": "json", "flush_ms": 50}
+    {"t": "clar", "c": "<clarification question>"}
+    {"t": "plan", "c": "<plan text>"}
+    {"t": "tok", "n": "<node>", "d": "<text delta>"}      # coalesced tokens
+    {"t": "tok", "n": "reporter", "s": 2, "d": "..."}       # tokens of report section 2 (0 = summary)
+    {"t": "sec", "i": 2, "h": "<title>", "len": 456}        # section 2 done == its concatenated "tok" deltas
+    {"t": "sec", "i": 2, "h": "<title>", "c": "<text>"}     # section 2 done, not (fully) streamed
+    {"t": "res", "len": 1234}                                # report == concatenated "tok" deltas
+                                                             # (sectioned: sections 0..n joined by blank lines)
+    {"t": "res", "c": "<report>"}                            # report not (fully) streamed
+    {"t": "done"}                                            # graph run finished
+    {"t": "err", "m": "<message>", "id": "<session_id>"}
+
+Encodings: "json" (text frames) or "msgpack" (binary frames). Transport-level
+compression (permessage-deflate) is negotiated by uvicorn; see WS_PER_MESSAGE_DEFLATE.
+"""
+import asyncio
+import json
+from typing import Optional
+
+from starlette.websockets import WebSocketDisconnect
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, JSON is the default encoding
+    msgpack = None
+
+PROTOCOL_VERSION = 2
+ENCODINGS = ("json", "msgpack")
+
+
+class SlowClient(Exception):
+    """The client did not drain its frames within the send timeout."""
+
+
+class ClientDisconnected(WebSocketDisconnect):
+    """A send failed because the client went away; handled like any other disconnect."""
+
+
+class FrameWriter:
+    """
+    Per-connection outbound channel for protocol v2.
+
+    Control frames go through a bounded queue drained by one sender task, so a
+    slow client can hold at most `max_queue` frames in memory. Token deltas are
+    not queued individually: they accumulate per node and are flushed as one
+    "tok" frame every `flush_interval` seconds, and only while the queue is
+    empty, so a slow client receives fewer, larger deltas instead of a backlog.
+    If a control frame cannot be queued within `send_timeout`, SlowClient is
+    raised and the caller should drop the connection. Once a send has failed
+    (the client disconnected), ClientDisconnected is raised instead.
+    """
+
+    def __init__(self, websocket, encoding: str = "json", flush_interval: float = 0.05,
+                 max_queue: int = 64, send_timeout: float = 10.0):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unsupported encoding {encoding!r}; choose from {', '.join(ENCODINGS)}.")
+        if encoding == "msgpack" and msgpack is None:
+            raise ValueError("encoding=msgpack requires the `msgpack` package on the server.")
+        self.websocket = websocket
+        self.encoding = encoding
+        self.flush_interval = flush_interval
+        self.send_timeout = send_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._deltas: dict = {}  # (node, section) -> [text, ...] not yet flushed
+        self._flush_lock = asyncio.Lock()
+        self._error: Optional[BaseException] = None
+        self._sender = asyncio.create_task(self._send_loop())
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def hello(self) -> None:
+        await self.send({"t": "hello", "v": PROTOCOL_VERSION, "enc": self.encoding,
+                         "flush_ms": int(self.flush_interval * 1000)})
+
+    def delta(self, node: str, text: str, section: Optional[int] = None) -> None:
+        """Buffer a token delta; it goes out with the next flush."""
+        self._deltas.setdefault((node, section), []).append(text)
+
+    async def send(self, frame: dict) -> None:
+        """Queue a control frame, after any buffered deltas so ordering is preserved."""
+        async with self._flush_lock:
+            await self._flush_deltas()
+            await self._put(frame)
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Flush what is left (best effort) and stop the background tasks."""
+        try:
+            async with self._flush_lock:
+                await self._flush_deltas()
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except (asyncio.TimeoutError, SlowClient, WebSocketDisconnect):
+            pass
+        finally:
+            self._flusher.cancel()
+            self._sender.cancel()
+
+    # --- Internals ---
+    async def _flush_deltas(self) -> None:
+        if not self._deltas:
+            return
+        pending, self._deltas = self._deltas, {}
+        for (node, section), parts in pending.items():
+            frame = {"t": "tok", "n": node, "d": "".join(parts)}
+            if section is not None:
+                frame["s"] = section
+            await self._put(frame)
+
+    async def _put(self, frame: dict) -> None:
+        if self._error is not None:
+            raise ClientDisconnected(code=1006, reason=f"Connection is no longer writable: {self._error!r}")
+        try:
+            await asyncio.wait_for(self._queue.put(frame), self.send_timeout)
+        except asyncio.TimeoutError:
+            raise SlowClient(f"Client did not drain {self._queue.maxsize} frames within {self.send_timeout}s.")
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            # While the client is behind, keep coalescing instead of queueing more frames
+            if self._deltas and self._queue.empty():
+                async with self._flush_lock:
+                    await self._flush_deltas()
+
+    async def _send_loop(self) -> None:
+        while True:
+            frame = await self._queue.get()
+            try:
+                if self._error is None:
+                    if self.encoding == "msgpack":
+                        await self.websocket.send_bytes(msgpack.packb(frame, use_bin_type=True))
+                    else:
+                        await self.websocket.send_text(json.dumps(frame, ensure_ascii=False, separators=(",", ":")))
+            except Exception as e:
+                # Keep draining so producers fail fast in _put instead of blocking
+                self._error = e
+            finally:
+                self._queue.task_done()